@@ -10,6 +10,26 @@ const ModelStat = mongoose.model(
   'model_stats'
 );
 
+// Precomputed dashboard snapshots written next to model_stats by the Python
+// stats writer; each holds ready-to-send JSON and a content-hash ETag
+const ModelSnapshot = mongoose.model(
+  'ModelSnapshot',
+  new mongoose.Schema({}, { strict: false }),
+  'model_snapshots'
+);
+const SUMMARY_KEY = '_all';
+const MARKET_KEY = '_market';
+
+// Send a snapshot as stored, or 304 when the client already has this ETag
+const sendSnapshot = (req, res, snapshot) => {
+  res.set('ETag', snapshot.etag);
+  res.set('Cache-Control', 'no-cache');
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+  return res.type('application/json').send(snapshot.json);
+};
+
 // Helper to get dummy data when real data isn't available
 const generateDefaultModelStats = (ticker) => {
   const today = new Date();
@@ -56,6 +76,11 @@ exports.getModelStats = async (req, res) => {
   try {
     const { ticker } = req.params;
     
+    const snapshot = await ModelSnapshot.findOne({ key: ticker }, { etag: 1, json: 1 }).lean();
+    if (snapshot) {
+      return sendSnapshot(req, res, snapshot);
+    }
+    
     // Try to get data from MongoDB with more detailed logging
     let doc = await ModelStat.findOne({ ticker });
     console.log(`Looking for ticker: ${ticker}, found: ${doc ? 'yes' : 'no'}`);
@@ -89,6 +114,38 @@ exports.getModelStats = async (req, res) => {
   }
 };
 
+// Headline stats and ETags of every ticker in one read
+exports.getAllModelStats = async (req, res) => {
+  try {
+    const snapshot = await ModelSnapshot.findOne({ key: SUMMARY_KEY }, { etag: 1, json: 1 }).lean();
+    if (!snapshot) {
+      return res.status(404).json({
+        message: 'No stats summary found. Please run model training first.'
+      });
+    }
+    return sendSnapshot(req, res, snapshot);
+  } catch (err) {
+    console.error('Error fetching model stats summary:', err);
+    res.status(500).json({ error: 'Server error', details: err.message });
+  }
+};
+
+// Rolling correlation matrix, betas to ^BSESN and the market regime
+exports.getMarketMatrix = async (req, res) => {
+  try {
+    const snapshot = await ModelSnapshot.findOne({ key: MARKET_KEY }, { etag: 1, json: 1 }).lean();
+    if (!snapshot) {
+      return res.status(404).json({
+        message: 'No market matrix found. Please run the stats or training pipeline first.'
+      });
+    }
+    return sendSnapshot(req, res, snapshot);
+  } catch (err) {
+    console.error('Error fetching market matrix:', err);
+    res.status(500).json({ error: 'Server error', details: err.message });
+  }
+};
+
 // Add a route to generate stats for all tickers if needed
 exports.generateAllModelStats = async (req, res) => {
   try {
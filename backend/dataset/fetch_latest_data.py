@@ -1,59 +1,44 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
-import numpy as np
-import ta
 from datetime import datetime, timedelta
-import pymongo
-from pymongo import MongoClient
 import time
+import argparse
 from tqdm import tqdm
 
-# MongoDB setup
-client = pymongo.MongoClient("mongodb://mongo:27017/")
-db = client["market_risk_assessment"]
-sensex_data_collection = db["sensex_data"]
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+from volatisense.cli import add_ingest_arguments
+from volatisense.defaults import INDEX_TICKER, SENSEX_TICKERS
+from volatisense.features import feature_frame, lean_frame
+from volatisense.instrument import RunReport, attach, count_rows, fail, profiled, stage, track
+from volatisense.labels import risk_codes, risk_labels
+from volatisense.pipeline import Pipeline, Stage
+from volatisense.price_store import PriceStore
+from volatisense.storage import (BUCKET_COLLECTION, ensure_bucket_indexes, ensure_sensex_indexes,
+                                 get_collection, upsert_frame, write_buckets)
 
-# List of Sensex companies (tickers)
-sensex_companies = [
-    "RELIANCE.NS","NIITLTD.NS" ,"TCS.NS", "HDFCBANK.NS", "INFY.NS", "HINDUNILVR.NS", "BHARTIARTL.NS",
-    "KOTAKBANK.NS", "ITC.NS", "AXISBANK.NS", "MARUTI.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS",
-    "HCLTECH.NS", "LUPIN.NS", "ULTRACEMCO.NS", "NTPC.NS", "WIPRO.NS", "M&M.NS", "POWERGRID.NS",
-    "SBIN.NS", "ASIANPAINT.NS", "DRREDDY.NS", "BAJAJ-AUTO.NS", "SUNPHARMA.NS", "JSWSTEEL.NS",
-    "TATAMOTORS.NS", "TITAN.NS", "HDFCLIFE.NS", "INDUSINDBK.NS", "DIVISLAB.NS","^BSESN","AAPL","SMSN.IL"
-]
+# Local OHLCV cache; only bars newer than the cached range are downloaded
+price_store = PriceStore()
+
+# List of Sensex companies (tickers), plus the index itself
+sensex_companies = SENSEX_TICKERS + [INDEX_TICKER]
 
 # Define risk label assignment
-def assign_risk_label(return_series):
-    # Calculate 5% VaR (Value at Risk)
-    var_95 = np.percentile(return_series, 5)
-    # Calculate 10% VaR for medium risk threshold
-    var_90 = np.percentile(return_series, 10)
-    
-    # Create risk labels
-    risk_labels = pd.Series(index=return_series.index, dtype=str)
-    
-    # Assign labels
-    risk_labels[return_series < var_95] = "High"
-    risk_labels[(return_series >= var_95) & (return_series < var_90)] = "Medium"
-    risk_labels[return_series >= var_90] = "Low"
-    
-    # Convert to int codes for easier storage (0=Low, 1=Medium, 2=High)
-    risk_codes = pd.Series(index=return_series.index, dtype=int)
-    risk_codes[risk_labels == "Low"] = 0
-    risk_codes[risk_labels == "Medium"] = 1
-    risk_codes[risk_labels == "High"] = 2
-    
-    return risk_codes, risk_labels
+def assign_risk_label(return_series, thresholds='full', window=None):
+    # High below the 5% VaR, Medium below the 10% VaR; thresholds over the full
+    # history, or rolling/expanding so earlier bars never change label
+    codes = risk_codes(return_series, thresholds, window)
+    
+    # int8 codes for storage (0=Low, 1=Medium, 2=High) and categorical labels
+    return (pd.Series(codes, index=return_series.index),
+            pd.Series(risk_labels(codes), index=return_series.index))
 
 def fetch_data_with_retries(ticker, start_date, end_date, max_attempts=3, delay=2):
-    """Fetch data with retry logic"""
+    """Fetch data with retry logic, served from the local price store when cached"""
     for attempt in range(max_attempts):
         try:
-            data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=False)
+            data = price_store.get(ticker, start_date, end_date)
             if not data.empty:
-                # Handle multi-index columns if present
-                if isinstance(data.columns, pd.MultiIndex):
-                    data.columns = data.columns.get_level_values(0)
                 return data
             else:
                 print(f"[WARNING] Empty data retrieved for {ticker}, retrying ({attempt + 1}/{max_attempts})")
@@ -65,105 +50,65 @@ def fetch_data_with_retries(ticker, start_date, end_date, max_attempts=3, delay=
     
     return pd.DataFrame()  # Return empty DataFrame if all attempts fail
 
-def compute_technical_indicators(df):
-    """Calculate technical indicators safely"""
-    result = df.copy()
-    
-    # Basic price and volume metrics
-    result['Return'] = result['Close'].pct_change()
-    result['MA_5'] = result['Close'].rolling(window=5).mean()
-    result['MA_10'] = result['Close'].rolling(window=10).mean()
-    result['MA_50'] = result['Close'].rolling(window=50).mean()
-    result['MA_200'] = result['Close'].rolling(window=200).mean()
-    result['STD_5'] = result['Close'].rolling(window=5).std()
-    result['Range'] = result['High'] - result['Low']
-    
-    # Safely calculate ratio metrics
-    result['Range_Ratio'] = np.where(result['Close'] != 0, 
-                                     (result['High'] - result['Low']) / result['Close'], 
-                                     0)
-    
-    result['Price_to_MA5'] = np.where(result['MA_5'] != 0, 
-                                     result['Close'] / result['MA_5'] - 1, 
-                                     0)
-    
-    result['Price_to_MA10'] = np.where(result['MA_10'] != 0, 
-                                      result['Close'] / result['MA_10'] - 1, 
-                                      0)
-    
-    # Momentum indicators
-    result['Momentum'] = result['Close'] - result['Close'].shift(5)
-    
-    # Volume metrics
-    if 'Volume' in result.columns and not result['Volume'].isna().all():
-        result['Volume_Change'] = result['Volume'].pct_change()
-    else:
-        result['Volume_Change'] = 0
-    
-    # Risk metrics
-    rolling_returns = result['Return'].rolling(100)
-    if len(result) >= 100:
-        result['VaR_95'] = rolling_returns.quantile(0.05)
-    else:
-        result['VaR_95'] = result['Return'].min()
-    
-    result['Volatility'] = result['Return'].rolling(20).std()
-    
-    # TA-Lib indicators (safely)
-    try:
-        result['RSI'] = ta.momentum.RSIIndicator(result['Close'], window=14).rsi()
-        
-        macd = ta.trend.MACD(result['Close'])
-        result['MACD'] = macd.macd()
-        result['MACD_Signal'] = macd.macd_signal()
-        
-        # Bollinger Bands
-        ma20 = result['Close'].rolling(20).mean()
-        std20 = result['Close'].rolling(20).std()
-        result['BB_Upper'] = ma20 + 2 * std20
-        result['BB_Lower'] = ma20 - 2 * std20
-        
-        # ATR
-        result['ATR'] = ta.volatility.AverageTrueRange(
-            result['High'], result['Low'], result['Close'], window=14
-        ).average_true_range()
-    except Exception as e:
-        print(f"[ERROR] Failed to compute some TA indicators: {str(e)}")
-    
-    # Replace infinities with NaN
-    result = result.replace([np.inf, -np.inf], np.nan)
-    
-    return result
+def compute_technical_indicators(df, low_memory=False):
+    """Calculate technical indicators with the shared vectorized kernel.
 
-def fetch_and_insert_data(ticker, start_date, end_date):
-    now = datetime.now()
-    print(f"[{now:%Y-%m-%d %H:%M:%S}] Fetching data for {ticker}...")
-    
-    # Fetch historical data
-    df = fetch_data_with_retries(ticker, start_date, end_date)
+    With ``low_memory`` the indicators come back as one float32 block next
+    to the untouched prices, with the warm-up rows already dropped.
+    """
+    if low_memory:
+        return lean_frame(df, 'ingest')
+    features = feature_frame(df, 'ingest')
+    return pd.concat([df, features], axis=1)
+
+def fetch_and_insert_data(ticker, start_date, end_date, df=None, layout='rows', low_memory=False,
+                          thresholds='full', label_window=None):
+    # Fetch historical data unless it was already prefetched in bulk
+    if df is None:
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Fetching data for {ticker}...")
+        df = fetch_data_with_retries(ticker, start_date, end_date)
     
+    df = prepare_frame(ticker, df, low_memory, thresholds, label_window)
+    if df is None:
+        return 0
+    return persist_frame(ticker, df, layout)
+
+def prepare_frame(ticker, df, low_memory=False, thresholds='full', label_window=None):
+    """Indicators and risk labels for one ticker's bars; None when nothing is left to write"""
     if df.empty:
         print(f"[ERROR] Could not fetch data for {ticker}. Skipping.")
-        return 0
+        fail("no data fetched")
+        return None
+    count_rows('input', len(df))
     
     # Compute technical indicators
-    df = compute_technical_indicators(df)
-    
-    # Drop rows with NaN values and reset index
-    df.dropna(inplace=True)
-    df.reset_index(inplace=True)
+    with stage('features'):
+        if low_memory:
+            # NaN rows are already gone and no float64 copy of the prices is kept
+            df = compute_technical_indicators(df, low_memory=True)
+        else:
+            df = compute_technical_indicators(df)
+            
+            # Drop rows with NaN values
+            df.dropna(inplace=True)
+        df.reset_index(inplace=True)
+    count_rows('rows', len(df))
     
     if df.empty:
         print(f"[WARNING] No valid data after processing for {ticker}. Skipping.")
-        return 0
+        return None
     
     # Compute risk labels (both codes and labels)
-    risk_codes, risk_labels = assign_risk_label(df['Return'])
-    df['Risk_Code'] = risk_codes
-    df['Risk_Label'] = risk_labels
-    
-    # Binary risk indicator (for compatibility with your model)
-    df['High_Risk'] = (df['Risk_Code'] == 2).astype(int)
+    with stage('labeling'):
+        codes, labels = assign_risk_label(df['Return'], thresholds, label_window)
+        df['Risk_Code'] = codes
+        df['Risk_Label'] = labels
+        if thresholds == 'rolling':
+            # The first window of bars has no threshold yet
+            df = df[df['Risk_Code'] >= 0].reset_index(drop=True)
+        
+        # Binary risk indicator (for compatibility with your model)
+        df['High_Risk'] = (df['Risk_Code'] == 2).astype(int)
     
     # Add ticker as a field
     df['Ticker'] = ticker
@@ -172,44 +117,147 @@ def fetch_and_insert_data(ticker, start_date, end_date):
     print(f"[INFO] Data quality for {ticker}:")
     print(f"  - Rows: {len(df)}")
     print(f"  - Risk Distribution: {df['Risk_Label'].value_counts(normalize=True) * 100}")
-    
+    return df
+
+def persist_frame(ticker, df, layout='rows'):
+    """Write a prepared frame to MongoDB; returns the number of documents written"""
+    now = datetime.now()
     try:
-        # Convert DataFrame to dictionary format for MongoDB
-        data_dict = df.to_dict(orient='records')
-        
-        # First remove existing data for this ticker
-        sensex_data_collection.delete_many({"Ticker": ticker})
-        
-        # Then insert new data
-        if data_dict:
-            result = sensex_data_collection.insert_many(data_dict)
-            print(f"[{now:%Y-%m-%d %H:%M:%S}] {len(result.inserted_ids)} records for {ticker} inserted into MongoDB.")
-            return len(result.inserted_ids)
-        else:
-            print(f"[WARNING] No data to insert for {ticker}.")
-            return 0
+        written = 0
+        with stage('persist'):
+            if layout in ('rows', 'both'):
+                # Upsert only new or changed rows, keyed by (Ticker, Date)
+                upserted, modified, deleted = upsert_frame(get_collection("sensex_data"), df, ticker)
+                print(f"[{now:%Y-%m-%d %H:%M:%S}] {ticker}: {upserted} new, {modified} updated, "
+                      f"{deleted} expired records in MongoDB.")
+                written += upserted + modified
+            if layout in ('buckets', 'both'):
+                # Monthly columnar buckets; only changed months are rewritten
+                upserted, modified, deleted = write_buckets(get_collection(BUCKET_COLLECTION), df, ticker)
+                print(f"[{now:%Y-%m-%d %H:%M:%S}] {ticker}: {upserted} new, {modified} updated, "
+                      f"{deleted} expired monthly buckets in MongoDB.")
+                if layout == 'buckets':
+                    written += upserted + modified
+        count_rows('written', written)
+        return written
     except Exception as e:
         print(f"[ERROR] Failed to insert data for {ticker}: {str(e)}")
+        fail(e)
         return 0
 
 # Main execution
-def main():
+def main(args):
+    report = RunReport('ingest', {"layout": args.layout, "workers": args.workers,
+                                  "low_memory": args.low_memory,
+                                  "label_thresholds": args.label_thresholds,
+                                  "pipelined": args.pipelined},
+                       path=args.report)
+    status = None
+    try:
+        with profiled(args.profile):
+            ingest_all(args, report)
+    except Exception as e:
+        print(f"[ERROR] Ingest aborted: {e}")
+        status = "aborted"
+    report.finish(status)
+
+def ingest_all(args, report):
     # Set date range
     end_date = datetime.today().strftime('%Y-%m-%d')
     start_date = (datetime.today() - timedelta(days=365*10)).strftime('%Y-%m-%d')  # 10 years of data
     
     print(f"Fetching data from {start_date} to {end_date}")
     
-    # Create index on Ticker field for faster queries
-    sensex_data_collection.create_index([("Ticker", pymongo.ASCENDING)])
+    # Unique (Ticker, Date) / (Ticker, Month) indexes for idempotent upserts and range queries
+    if args.layout in ('rows', 'both'):
+        ensure_sensex_indexes(get_collection("sensex_data"))
+    if args.layout in ('buckets', 'both'):
+        ensure_bucket_indexes(get_collection(BUCKET_COLLECTION))
     
-    # Fetch and insert data for all Sensex companies
+    if args.pipelined:
+        ingest_pipelined(args, report, start_date, end_date)
+        return
+    
+    # Fetch all Sensex companies concurrently, retrying failures in later rounds
+    with report.stage('fetch'):
+        frames, failed = price_store.get_many(sensex_companies, start_date, end_date,
+                                              max_workers=args.workers)
+    if failed:
+        print(f"[ERROR] Could not fetch data for: {', '.join(failed)}")
+        for company in failed:
+            report.add({"ticker": company, "status": "error", "error": "fetch failed", "seconds": 0.0})
+    
+    # Compute indicators and insert data for every ticker that was fetched
     total_records = 0
-    for company in tqdm(sensex_companies):
-        records = fetch_and_insert_data(company, start_date, end_date)
+    for company in tqdm([c for c in sensex_companies if c in frames]):
+        with track(company) as recorder:
+            # Popped so each raw frame is released once its ticker is written
+            records = fetch_and_insert_data(company, start_date, end_date, df=frames.pop(company),
+                                            layout=args.layout,
+                                            low_memory=args.low_memory,
+                                            thresholds=args.label_thresholds,
+                                            label_window=args.label_window)
+        report.add(recorder.result())
         total_records += records
     
-    print(f"Data collection complete. Total records inserted: {total_records}")
+    print(f"Data collection complete. Total records written: {total_records}")
+
+def ingest_pipelined(args, report, start_date, end_date):
+    """Overlap downloads, indicator computation and MongoDB writes across tickers.
+
+    Same per-ticker steps as the serial loop, run as fetch -> compute -> write
+    stages joined by bounded queues, so a slow stage holds back the ones
+    before it instead of piling frames up in memory.
+    """
+    options = dict(low_memory=args.low_memory,
+                   thresholds=args.label_thresholds,
+                   label_window=args.label_window)
+    results = {}
+    
+    def fetch(company):
+        with track(company) as recorder:
+            with stage('fetch'):
+                df = fetch_data_with_retries(company, start_date, end_date)
+            if df.empty:
+                print(f"[ERROR] Could not fetch data for {company}. Skipping.")
+                fail("fetch failed")
+                results[company] = recorder.result()
+                return None
+        return recorder, df
+    
+    def compute(item):
+        recorder, df = item
+        with attach(recorder):
+            df = prepare_frame(recorder.ticker, df, **options)
+        if df is None:
+            results[recorder.ticker] = recorder.result()
+            return None
+        return recorder, df
+    
+    def write(item):
+        recorder, df = item
+        with attach(recorder):
+            records = persist_frame(recorder.ticker, df, args.layout)
+        results[recorder.ticker] = recorder.result()
+        return records
+    
+    pipeline = Pipeline([
+        Stage('fetch', fetch, args.workers),
+        Stage('compute', compute, args.compute_workers),
+        Stage('write', write, args.write_workers),
+    ], queue_size=args.queue_size)
+    with report.stage('pipeline'):
+        total_records = sum(pipeline.run(sensex_companies))
+    
+    # Report tickers in list order whatever order they finished in
+    for company in sensex_companies:
+        if company in results:
+            report.add(results[company])
+    report.throughput = pipeline.stats()
+    pipeline.log()
+    print(f"Data collection complete. Total records written: {total_records}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    add_ingest_arguments(parser)
+    main(parser.parse_args())
@@ -1,244 +1,141 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 import os
-import pickle
-import pymongo
+import sys
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 from datetime import datetime
 import warnings
 import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+from volatisense.cli import add_train_arguments
+from volatisense.defaults import ACCURACY_DROP, DRIFT_THRESHOLD, UPDATE_ROUNDS, WALK_FORWARD_STEP
+from volatisense.features import feature_frame, lean_frame
+from volatisense.backtest import (VAR_LEVELS, breach_tests, expanding_windows, var_breaches,
+                                  var_forecasts)
+from volatisense.instrument import RUN_LOG, RunReport, attach, count_rows, fail, profiled, stage, track
+from volatisense.labels import risk_codes
+from volatisense.market import (MARKET_FEATURES, join_market, load_market, ticker_features,
+                                write_market_snapshot)
+from volatisense.price_store import PriceStore
+from volatisense.registry import BASELINE_DIR, POOLED_DIR, ModelRegistry, load_artifacts, save_artifacts
+from volatisense.snapshots import (SNAPSHOT_COLLECTION, ensure_snapshot_indexes, refresh_summary,
+                                   write_ticker_snapshot)
+from volatisense.stats import build_model_stats
+from volatisense.storage import get_collection
 
 warnings.filterwarnings("ignore")
 
+# Local OHLCV cache shared with the ingest script
+price_store = PriceStore()
+
+# Per-ticker model artifacts (UBJSON booster, scaler arrays, manifest)
+model_registry = ModelRegistry()
+
+# Incremental (warm-start) updates
+MIN_CHECK_BARS = 40       # Bars needed before drift/accuracy checks are trusted
+MIN_UPDATE_BARS = 20      # New bars to accumulate before adding trees (fewer cannot form a leaf)
+MAX_UPDATES = 60          # Full retrain after this many updates to bound model size
+
+# Pooled (cross-sectional) model
+POOLED_ROUNDS = 100       # Boosting rounds for the single multi-ticker model
+TICKER_SECTORS = {
+    "RELIANCE.NS": "Energy", "NIITLTD.NS": "IT", "TCS.NS": "IT", "HDFCBANK.NS": "Financials",
+    "INFY.NS": "IT", "HINDUNILVR.NS": "Consumer", "BHARTIARTL.NS": "Telecom",
+    "KOTAKBANK.NS": "Financials", "ITC.NS": "Consumer", "AXISBANK.NS": "Financials",
+    "MARUTI.NS": "Auto", "BAJFINANCE.NS": "Financials", "BAJAJFINSV.NS": "Financials",
+    "HCLTECH.NS": "IT", "LUPIN.NS": "Pharma", "ULTRACEMCO.NS": "Materials", "NTPC.NS": "Utilities",
+    "WIPRO.NS": "IT", "M&M.NS": "Auto", "POWERGRID.NS": "Utilities", "SBIN.NS": "Financials",
+    "ASIANPAINT.NS": "Materials", "DRREDDY.NS": "Pharma", "BAJAJ-AUTO.NS": "Auto",
+    "SUNPHARMA.NS": "Pharma", "JSWSTEEL.NS": "Materials", "TATAMOTORS.NS": "Auto",
+    "TITAN.NS": "Consumer", "HDFCLIFE.NS": "Financials", "INDUSINDBK.NS": "Financials",
+    "DIVISLAB.NS": "Pharma", "AAPL": "IT", "SMSN.IL": "IT",
+}
+
+# Walk-forward evaluation
+WALK_FORWARD_INITIAL = 500  # Bars (two trading years) before the first scored window
+WALK_FORWARD_ROUNDS = 100   # Same as the company models' XGBClassifier default
+
 # Helper Functions
 def fetch_stock_data(ticker, start, end):
-    # Fetch data without auto-adjust
-    data = yf.download(ticker, start=start, end=end, auto_adjust=False)
+    # Served from the local price store; only missing bars are downloaded
+    with stage('fetch'):
+        data = price_store.get(ticker, start, end)
+    count_rows('input', len(data))
     if data.empty:
         raise ValueError(f"No data fetched for {ticker} between {start} and {end}.")
     return data
 
 
-def compute_rsi(series, window=14):
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-
-def compute_macd(series):
-    exp1 = series.ewm(span=12, adjust=False).mean()
-    exp2 = series.ewm(span=26, adjust=False).mean()
-    macd = exp1 - exp2
-    signal = macd.ewm(span=9, adjust=False).mean()
-    return macd, signal
-
-
-def engineer_features(data):
-    # Use Close price for all calculations
-    price_col = 'Close'
-
-    # Basic returns and volatility
-    data['Return'] = data[price_col].pct_change()
-    data['Volatility'] = data['Return'].rolling(window=5).std()
-
-    # Moving averages
-    data['SMA_5'] = data[price_col].rolling(window=5).mean()
-    data['SMA_10'] = data[price_col].rolling(window=10).mean()
-    data['EMA_5'] = data[price_col].ewm(span=5, adjust=False).mean()
-    data['EMA_10'] = data[price_col].ewm(span=10, adjust=False).mean()
+def engineer_features(data, low_memory=False, market=None):
+    # Returns, volatility, moving averages, MACD and RSI from the shared kernel
+    with stage('features'):
+        if low_memory:
+            # Features as one float32 block next to the raw prices, NaN rows already dropped
+            data = lean_frame(data, 'training')
+        else:
+            features = feature_frame(data, 'training')
+            data = pd.concat([data, features], axis=1)
 
-    # Momentum and trend indicators
-    data['MACD'], data['MACD_Signal'] = compute_macd(data[price_col])
-    data['RSI'] = compute_rsi(data[price_col])
+            # Drop any rows with NaNs
+            data = data.dropna()
 
-    # Drop any rows with NaNs
-    data = data.dropna()
+        if market is not None:
+            # Correlation/beta to ^BSESN and the market regime (volatisense.market)
+            data = join_market(data, market)
+    count_rows('rows', len(data))
     return data
 
 
-def label_risk(data):
+def label_risk(data, thresholds='full', window=None):
     # Label based on VaR quantiles (5% high, 10% medium)
-    q05 = data['Return'].quantile(0.05)
-    q10 = data['Return'].quantile(0.10)
-    conditions = [
-        data['Return'] < q05,
-        (data['Return'] >= q05) & (data['Return'] < q10),
-        data['Return'] >= q10
-    ]
-    # 2=High risk, 1=Medium risk, 0=Low risk
-    choices = [2, 1, 0]
-    data['Risk'] = np.select(conditions, choices)
+    with stage('labeling'):
+        # int8: 2=High risk, 1=Medium risk, 0=Low risk
+        data['Risk'] = risk_codes(data['Return'], thresholds, window)
+        if thresholds != 'full':
+            # Bars before the first rolling/expanding threshold stay unlabeled
+            data = data[data['Risk'] >= 0]
     return data
 
 
-# Fixed function to save model statistics to MongoDB
-# Fixed function to save model statistics to MongoDB
-def save_model_stats(ticker, model, X_test, y_test, start_date):
+# Save model statistics and dashboard payload to MongoDB
+def save_model_stats(ticker, model, X_test, y_test, start_date, data=None, accuracy=None,
+                     backtest=None):
     print(f"[INFO] Saving model stats for {ticker} to MongoDB")
     
-    # Connect to MongoDB
-    client = pymongo.MongoClient("mongodb://mongo:27017/")
-    db = client["market_risk_assessment"]
-    stats_collection = db["model_stats"]
-    
-    # Calculate accuracy
-    y_pred = model.predict(X_test)
-    accuracy = float(accuracy_score(y_test, y_pred) * 100)
+    # Shared pooled MongoDB connection
+    stats_collection = get_collection("model_stats")
     
-    # Get recent data for charts (last year)
-    from datetime import datetime, timedelta
-    end_date = datetime.today().strftime('%Y-%m-%d')
-    chart_start = (datetime.today().replace(year=datetime.today().year-1)).strftime('%Y-%m-%d')
+    # Calculate accuracy unless the caller already measured it
+    if accuracy is None:
+        y_pred = model.predict(X_test)
+        accuracy = float(accuracy_score(y_test, y_pred) * 100)
     
     try:
-        data = fetch_stock_data(ticker, chart_start, end_date)
-        
-        # Calculate returns for risk metrics (returns in decimal form, e.g. 0.01 for 1%)
-        returns = data['Close'].pct_change().dropna()
-        current_price = float(data['Close'].iloc[-1])
-        
-        # Calculate VaR metrics as percentage of current price
-        try:
-            # Get percentage VaR (negative values represent losses)
-            var95_pct = float(returns.quantile(0.05))
-            var99_pct = float(returns.quantile(0.01))
-            
-            # Convert percentage VaR to absolute rupee amount with reasonable caps
-            # Use absolute values to show the magnitude of potential loss
-            var95 = abs(var95_pct * current_price)
-            var99 = abs(var99_pct * current_price)
-            
-            # Cap at 20% of price as sanity check for unrealistically high values
-            max_reasonable_var = current_price * 0.20
-            var95 = min(var95, max_reasonable_var)
-            var99 = min(var99, max_reasonable_var)
-        except Exception as e:
-            print(f"[WARNING] Error calculating VaR: {e}, using fallback")
-            var95 = current_price * 0.03  # 3% of price as fallback
-            var99 = current_price * 0.05  # 5% of price as fallback
-            var95_pct = -0.03  # Needed for VaR distribution calculation
-            var99_pct = -0.05  # Needed for VaR distribution calculation
-
-        # Conditional VaR with additional error handling
-        try:
-            cvar_returns = returns[returns <= returns.quantile(0.05)]
-            if not cvar_returns.empty:
-                cvar = abs(float(cvar_returns.mean() * current_price))
-                # Cap at 25% of price as sanity check
-                cvar = min(cvar, current_price * 0.25)
-            else:
-                cvar = var95 * 1.2  # Reasonable fallback
-        except Exception as e:
-            print(f"[WARNING] Error calculating CVaR: {e}, using fallback")
-            cvar = var95 * 1.2  # Reasonable fallback
-        
-        # Create price history for chart (last 30 days)
-        price_history = []
-        for idx, row in data.iloc[-30:].iterrows():
-            try:
-                date_str = idx.strftime('%Y-%m-%d') if hasattr(idx, 'strftime') else str(idx).split(' ')[0]
-                price_history.append({
-                    "date": date_str,
-                    "price": float(row['Close'])
-                })
-            except Exception as e:
-                print(f"[WARNING] Error processing price history item: {e}")
-        
-        # Calculate rolling volatility with improved data preparation
-        try:
-            # Calculate rolling volatility (returns in decimal form)
-            volatility = returns.rolling(window=30).std().dropna()
-            volatility_data = []
-            
-            # Make sure we get the most recent 30 days (or as many as available)
-            date_range = data.index[-30:] if len(data) >= 30 else data.index
-            
-            # Create volatility data with proper dates aligned with price history
-            for date in date_range:
-                date_str = date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date).split(' ')[0]
-                
-                # Get volatility value for this date, or estimate if not available
-                try:
-                    if date in volatility.index:
-                        vol_value = float(volatility.loc[date])
-                    else:
-                        # For dates without volatility data, use a reasonable estimate
-                        vol_value = 0.02  # 2% volatility as default
-                except Exception:
-                    vol_value = 0.02  # Fallback value
-                    
-                volatility_data.append({
-                    "date": date_str,
-                    "volatility": vol_value
-                })
-        except Exception as e:
-            print(f"[WARNING] Error calculating volatility data: {e}")
-            # Create volatility entries that match the price history dates
-            volatility_data = []
-            if price_history:
-                for i, price_point in enumerate(price_history):
-                    volatility_data.append({
-                        "date": price_point["date"],
-                        "volatility": 0.02 + (0.002 * (i % 5))  # Some variation
-                    })
-                    
-        # Create VaR distribution data with improved calculations
-        var_data = []
-        try:
-            # Create reasonably spaced loss points from 0 to 1.5*VAR99 (as percentages)
-            max_loss_pct = min(abs(float(var99_pct)) * 1.5, 0.10)  # Cap at 10%
-            loss_range = np.linspace(0, max_loss_pct, 20)
-            
-            for loss_pct in loss_range:
-                # Calculate probability of loss being greater than this percentage
-                prob = float((returns <= -loss_pct).mean())
-                var_data.append({
-                    "loss": f"{loss_pct*100:.1f}%",
-                    "probability": prob
-                })
-        except Exception as e:
-            print(f"[WARNING] Error calculating VaR distribution: {e}")
-            # Fallback dummy data with realistic values
-            for i in range(20):
-                loss_pct = i * 0.005  # 0% to 9.5% in steps of 0.5%
-                var_data.append({
-                    "loss": f"{loss_pct*100:.1f}%",
-                    "probability": float(max(0.5 - i*0.025, 0.001))  # Decreasing probability
-                })
-        
-        # Determine risk level based on 5% VaR
-        risk_level = "Medium"  # Default
-        if var95 > current_price * 0.03:  # More than 3% loss
-            risk_level = "High"
-        elif var95 < current_price * 0.015:  # Less than 1.5% loss
-            risk_level = "Low"
+        # Reuse the training prices when available; otherwise read the last year from the store
+        if data is None:
+            end_date = datetime.today().strftime('%Y-%m-%d')
+            chart_start = (datetime.today().replace(year=datetime.today().year-1)).strftime('%Y-%m-%d')
+            data = fetch_stock_data(ticker, chart_start, end_date)
         
-        # Create model stats document
-        model_stats = {
-            "ticker": ticker,
-            "var95": float(var95),
-            "var99": float(var99),
-            "cvar": float(cvar),
-            "riskLevel": risk_level,
-            "accuracy": float(accuracy),
-            "priceHistory": price_history,
-            "volatilityData": volatility_data,
-            "varData": var_data,
-            "updatedAt": datetime.now()
-        }
+        # VaR/CVaR, chart series and VaR curve from one sorted pass over the returns
+        with stage('stats'):
+            model_stats = build_model_stats(ticker, data, accuracy)
+            if backtest is not None:
+                model_stats["backtest"] = backtest
         
         # Update or insert model stats
-        result = stats_collection.update_one(
-            {"ticker": ticker},
-            {"$set": model_stats},
-            upsert=True
-        )
+        with stage('persist'):
+            result = stats_collection.update_one(
+                {"ticker": ticker},
+                {"$set": model_stats},
+                upsert=True
+            )
         
         if result.modified_count > 0:
             print(f"[INFO] Updated existing stats for {ticker}")
@@ -246,118 +143,648 @@ def save_model_stats(ticker, model, X_test, y_test, start_date):
             print(f"[INFO] Created new stats for {ticker}")
         else:
             print(f"[INFO] No changes to stats for {ticker}")
+        
+        # Compact dashboard snapshot, rewritten only when its content hash changes
+        with stage('persist'):
+            changed = write_ticker_snapshot(get_collection(SNAPSHOT_COLLECTION), model_stats)
+        if not changed:
+            print(f"[INFO] Dashboard snapshot for {ticker} unchanged")
             
     except Exception as e:
         print(f"[ERROR] Failed to save stats for {ticker}: {e}")
+        fail(e)
 
 # Training Functions
-def train_baseline_model(start, end):
+def evaluation_metrics(model, X_test, y_test, n_train):
+    return {
+        "accuracy": float(accuracy_score(y_test, model.predict(X_test)) * 100),
+        "n_train": int(n_train),
+        "n_test": int(len(y_test)),
+    }
+
+
+def train_baseline_model(start, end, low_memory=False, market=None):
     print(f"[INFO] Training baseline model on ^BSESN from {start} to {end}")
-    data = fetch_stock_data('^BSESN', start, end)
-    data = engineer_features(data)
+    prices = fetch_stock_data('^BSESN', start, end)
+    data = engineer_features(prices, low_memory, ticker_features(market, '^BSESN'))
     data = label_risk(data)
 
     feature_cols = [c for c in data.columns if c not in ['Risk']]
     X = data[feature_cols]
     y = data['Risk']
 
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    with stage('fit'):
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_scaled, y, test_size=0.2, stratify=y, random_state=42
-    )
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_scaled, y, test_size=0.2, stratify=y, random_state=42
+        )
 
-    model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss')
-    model.fit(X_train, y_train)
+        model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss')
+        model.fit(X_train, y_train)
 
-    # Save baseline model and scaler
-    baseline_dir = os.path.normpath(
-        os.path.join(os.path.dirname(__file__), '..', 'model', 'baseline')
-    )
-    os.makedirs(baseline_dir, exist_ok=True)
-    with open(os.path.join(baseline_dir, 'baseline_model.pkl'), 'wb') as f:
-        pickle.dump(model, f)
-    with open(os.path.join(baseline_dir, 'scaler.pkl'), 'wb') as f:
-        pickle.dump(scaler, f)
+    # Save baseline booster (UBJSON), scaler arrays and manifest
+    baseline_dir = BASELINE_DIR
+    metrics = evaluation_metrics(model, X_test, y_test, len(X_train))
+    with stage('persist'):
+        save_artifacts(baseline_dir, '^BSESN', model, scaler, feature_cols, metrics=metrics)
 
     print(f"[INFO] Baseline artifacts saved to {baseline_dir}")
     
     # Save model stats to MongoDB
-    save_model_stats('^BSESN', model, X_test, y_test, start)
+    save_model_stats('^BSESN', model, X_test, y_test, start, data=prices)
     
     return model, scaler
 
 
-def train_company_model(ticker, baseline_model, scaler, start, end):
+def load_baseline_model(market=None):
+    """Saved ^BSESN baseline as (model, scaler), or None if missing or built on other features"""
+    try:
+        artifacts = load_artifacts(BASELINE_DIR)
+    except FileNotFoundError:
+        return None
+    with_market = any(f in MARKET_FEATURES for f in artifacts.manifest.get('features', []))
+    if artifacts.scaler is None or with_market != (market is not None):
+        print("[INFO] Saved ^BSESN baseline does not match the requested features, retraining it")
+        return None
+    print(f"[INFO] Reusing the ^BSESN baseline from {BASELINE_DIR}")
+    return artifacts.model, artifacts.scaler
+
+
+def population_stability(reference, current, bins=5):
+    """Population stability index of current against reference, on reference quantile bins"""
+    edges = np.quantile(reference, np.linspace(0, 1, bins + 1)[1:-1])
+    expected = np.bincount(np.searchsorted(edges, reference, side='right'), minlength=bins) / len(reference)
+    actual = np.bincount(np.searchsorted(edges, current, side='right'), minlength=bins) / len(current)
+    # Empty bins would make the log term infinite
+    expected = np.clip(expected, 1e-4, None)
+    actual = np.clip(actual, 1e-4, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def structural_change(manifest, feature_cols):
+    """Why the saved model cannot take more trees at all, or None.
+
+    Checked before the saved scaler or model sees the new bars, since both
+    reject columns they were not fitted on.
+    """
+    if manifest is None or 'full_trained_through' not in manifest:
+        return "no incremental state"
+    if manifest.get('features') != feature_cols:
+        return "feature set changed"
+    if manifest.get('incremental_updates', 0) >= MAX_UPDATES:
+        return f"{MAX_UPDATES} updates since the last full retrain"
+    return None
+
+
+def plan_update(manifest, data, feature_cols, oos_correct, oos_total,
+                drift_threshold=DRIFT_THRESHOLD, accuracy_drop=ACCURACY_DROP):
+    """Choose 'incremental' or 'full' for a company model; returns (mode, reason)"""
+    reason = structural_change(manifest, feature_cols)
+    if reason is not None:
+        return 'full', reason
+
+    full_through = pd.Timestamp(manifest['full_trained_through'])
+    returns = data['Return']
+    recent = returns[returns.index > full_through].to_numpy()
+    if len(recent) >= MIN_CHECK_BARS:
+        psi = population_stability(returns[returns.index <= full_through].to_numpy(), recent)
+        if psi > drift_threshold:
+            return 'full', f"return drift PSI {psi:.2f} > {drift_threshold}"
+
+    if oos_total >= MIN_CHECK_BARS:
+        oos_accuracy = 100.0 * oos_correct / oos_total
+        reference = manifest.get('reference_accuracy', oos_accuracy)
+        if reference - oos_accuracy > accuracy_drop:
+            return 'full', f"accuracy {oos_accuracy:.1f}% vs {reference:.1f}% at full retrain"
+    return 'incremental', "within drift and accuracy thresholds"
+
+
+def train_company_model(ticker, baseline_model, scaler, start, end, n_jobs=None,
+                        incremental=False, update_rounds=UPDATE_ROUNDS,
+                        drift_threshold=DRIFT_THRESHOLD, accuracy_drop=ACCURACY_DROP,
+                        low_memory=False, market=None):
     print(f"[INFO] Training model for {ticker}")
-    data = fetch_stock_data(ticker, start, end)
-    data = engineer_features(data)
+    prices = fetch_stock_data(ticker, start, end)
+    data = engineer_features(prices, low_memory, market)
     data = label_risk(data)
 
     feature_cols = [c for c in data.columns if c not in ['Risk']]
     X = data[feature_cols]
     y = data['Risk']
 
-    # Transform or refit scaler
-    try:
-        X_scaled = scaler.transform(X)
-    except ValueError:
-        print(f"[WARNING] Feature mismatch for {ticker}, refitting scaler")
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+    if incremental:
+        model = update_company_model(ticker, data, feature_cols, prices, start, n_jobs,
+                                     update_rounds, drift_threshold, accuracy_drop)
+        if model is not None:
+            return model
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_scaled, y, test_size=0.2, stratify=y, random_state=42
-    )
-
-    model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss')
-    model.fit(X_train, y_train)
+    with stage('fit'):
+        # Transform or refit scaler
+        warm_start = True
+        try:
+            X_scaled = scaler.transform(X)
+        except ValueError:
+            print(f"[WARNING] Feature mismatch for {ticker}, refitting scaler")
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+            warm_start = False
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_scaled, y, test_size=0.2, stratify=y, random_state=42
+        )
 
-    # Save company model and scaler
-    company_dir = os.path.normpath(
-        os.path.join(os.path.dirname(__file__), '..', 'model', 'models', ticker)
-    )
-    os.makedirs(company_dir, exist_ok=True)
-    with open(os.path.join(company_dir, 'model.pkl'), 'wb') as f:
-        pickle.dump(model, f)
-    with open(os.path.join(company_dir, 'scaler.pkl'), 'wb') as f:
-        pickle.dump(scaler, f)
+        model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss',
+                                  n_jobs=n_jobs)
+        # Continue boosting from the ^BSESN baseline when both share the same scaled inputs
+        warm_start = warm_start and getattr(baseline_model, 'n_features_in_', None) == X_scaled.shape[1]
+        model.fit(X_train, y_train, xgb_model=baseline_model.get_booster() if warm_start else None)
+
+    # Save company booster (UBJSON), scaler arrays and manifest
+    company_dir = model_registry.path(ticker)
+    metrics = evaluation_metrics(model, X_test, y_test, len(X_train))
+    trained_through = data.index[-1].strftime('%Y-%m-%d')
+    with stage('persist'):
+        model_registry.save(ticker, model, scaler, feature_cols, metrics=metrics, extra={
+            "mode": "full",
+            "warm_start": "baseline" if warm_start else None,
+            "trained_through": trained_through,
+            "full_trained_through": trained_through,
+            "reference_accuracy": metrics["accuracy"],
+            "incremental_updates": 0,
+            "oos_correct": 0,
+            "oos_total": 0,
+        })
 
     print(f"[INFO] Artifacts for {ticker} saved to {company_dir}")
     
     # Save model stats to MongoDB
-    save_model_stats(ticker, model, X_test, y_test, start)
+    save_model_stats(ticker, model, X_test, y_test, start, data=prices)
     
     return model
 
 
+def update_company_model(ticker, data, feature_cols, prices, start, n_jobs,
+                         update_rounds, drift_threshold, accuracy_drop):
+    """Add a few trees to the saved company model using only bars it has not seen.
+
+    Returns the updated (or unchanged) model, or None when a full retrain is
+    needed. Each night's new bars are scored by the previous model before it
+    trains on them, so ``oos_correct``/``oos_total`` in the manifest are a
+    running out-of-sample accuracy since the last full retrain.
+    """
+    manifest = model_registry.manifest(ticker)
+    reason = structural_change(manifest, feature_cols)
+    if reason is not None:
+        print(f"[INFO] {ticker}: full retrain ({reason})")
+        return None
+    previous = model_registry.load(ticker)
+
+    new = data.index > pd.Timestamp(manifest['trained_through'])
+    if new.sum() < MIN_UPDATE_BARS:
+        # Left unsaved so the bars keep accumulating until the next run
+        print(f"[INFO] {ticker}: {new.sum()} bars after {manifest['trained_through']}, "
+              f"model unchanged until {MIN_UPDATE_BARS}")
+        return previous.model
+
+    X_new = previous.scaler.transform(data.loc[new, feature_cols])
+    y_new = data.loc[new, 'Risk'].to_numpy()
+    oos_correct = manifest.get('oos_correct', 0) + int((previous.model.predict(X_new) == y_new).sum())
+    oos_total = manifest.get('oos_total', 0) + int(len(y_new))
+
+    mode, reason = plan_update(manifest, data, feature_cols, oos_correct, oos_total,
+                               drift_threshold, accuracy_drop)
+    if mode == 'full':
+        print(f"[INFO] {ticker}: full retrain ({reason})")
+        return None
+
+    # Native API: a month of bars often lacks a class, which XGBClassifier.fit rejects
+    params = {'objective': 'multi:softmax', 'num_class': 3, 'eval_metric': 'mlogloss'}
+    if n_jobs:
+        params['nthread'] = n_jobs
+    with stage('fit'):
+        booster = xgb.train(params, xgb.DMatrix(X_new, label=y_new), num_boost_round=update_rounds,
+                            xgb_model=previous.model.get_booster())
+        model = xgb.XGBClassifier()
+        model.load_model(bytearray(booster.save_raw('ubj')))
+
+    # Until enough new bars were scored, report the full retrain's held-out accuracy
+    accuracy = (100.0 * oos_correct / oos_total if oos_total >= MIN_CHECK_BARS
+                else manifest.get('reference_accuracy', manifest['metrics'].get('accuracy', 0.0)))
+    with stage('persist'):
+        model_registry.save(ticker, model, previous.scaler, feature_cols, metrics={
+            "accuracy": float(accuracy),
+            "n_new": int(len(y_new)),
+            "oos_bars": oos_total,
+        }, extra={
+            "mode": "incremental",
+            "warm_start": manifest.get('warm_start'),
+            "trained_through": data.index[-1].strftime('%Y-%m-%d'),
+            "full_trained_through": manifest['full_trained_through'],
+            "reference_accuracy": manifest.get('reference_accuracy'),
+            "incremental_updates": manifest.get('incremental_updates', 0) + 1,
+            "oos_correct": oos_correct,
+            "oos_total": oos_total,
+        })
+    print(f"[INFO] {ticker}: added {update_rounds} trees on {len(y_new)} new bars ({reason})")
+
+    save_model_stats(ticker, model, None, None, start, data=prices, accuracy=accuracy)
+    return model
+
+
+# Pooled Training
+def pooled_dataset(tickers, start, end):
+    """All tickers' labeled features stacked, with categorical Ticker/Sector and a test flag"""
+    frames = []
+    for ticker in tickers:
+        try:
+            data = label_risk(engineer_features(fetch_stock_data(ticker, start, end)))
+        except Exception as e:
+            print(f"[WARNING] Skipping {ticker} in pooled dataset: {e}")
+            continue
+        # Same stratified split as the per-ticker models, so accuracies are comparable
+        _, test_idx = train_test_split(np.arange(len(data)), test_size=0.2,
+                                       stratify=data['Risk'], random_state=42)
+        is_test = np.zeros(len(data), dtype=bool)
+        is_test[test_idx] = True
+        frames.append(data.assign(Ticker=ticker, Sector=TICKER_SECTORS.get(ticker, "Other"),
+                                  Is_Test=is_test))
+    if not frames:
+        raise ValueError("No ticker produced training data")
+
+    pooled = pd.concat(frames)
+    for col in ('Ticker', 'Sector'):
+        pooled[col] = pd.Categorical(pooled[col], categories=sorted(pooled[col].unique()))
+    return pooled
+
+
+def train_pooled_model(tickers, start, end, rounds=POOLED_ROUNDS, n_jobs=None):
+    """Train one hist-based XGBoost model over every ticker and compare it with per-ticker models"""
+    data = pooled_dataset(tickers, start, end)
+    feature_cols = [c for c in data.columns if c not in ('Risk', 'Is_Test')]
+    numeric_cols = [c for c in feature_cols if c not in ('Ticker', 'Sector')]
+    train, test = data[~data['Is_Test']], data[data['Is_Test']]
+    print(f"[INFO] Pooled dataset: {len(train)} train / {len(test)} test rows, "
+          f"{data['Ticker'].nunique()} tickers")
+
+    params = {'objective': 'multi:softmax', 'num_class': 3, 'eval_metric': 'mlogloss',
+              'tree_method': 'hist'}
+    if n_jobs:
+        params['nthread'] = n_jobs
+    t0 = time.perf_counter()
+    dtrain = xgb.DMatrix(train[feature_cols], label=train['Risk'], enable_categorical=True)
+    booster = xgb.train(params, dtrain, num_boost_round=rounds)
+    pooled_seconds = time.perf_counter() - t0
+    pred = booster.predict(xgb.DMatrix(test[feature_cols], enable_categorical=True))
+    correct = pd.Series(pred == test['Risk'].to_numpy(), index=test.index)
+
+    # Reference: one model per ticker on the same rows, fitted here without any I/O
+    per_ticker = {}
+    separate_seconds = 0.0
+    separate_bytes = 0
+    for ticker, rows in data.groupby('Ticker', observed=True):
+        fit_rows = rows[~rows['Is_Test']]
+        test_rows = rows[rows['Is_Test']]
+        t1 = time.perf_counter()
+        model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss',
+                                  n_jobs=n_jobs)
+        model.fit(fit_rows[numeric_cols], fit_rows['Risk'])
+        separate_seconds += time.perf_counter() - t1
+        separate_bytes += len(model.get_booster().save_raw('ubj'))
+        per_ticker[ticker] = {
+            "pooled": float(correct[(test['Ticker'] == ticker).to_numpy()].mean() * 100),
+            "separate": float(accuracy_score(test_rows['Risk'], model.predict(test_rows[numeric_cols])) * 100),
+            "n_test": int(len(test_rows)),
+        }
+
+    metrics = {
+        "accuracy": float(correct.mean() * 100),
+        "separate_accuracy": float(np.mean([r['separate'] for r in per_ticker.values()])),
+        "per_ticker": per_ticker,
+        "n_train": int(len(train)),
+        "n_test": int(len(test)),
+        "train_seconds": pooled_seconds,
+        "separate_train_seconds": separate_seconds,
+        "separate_artifact_bytes": separate_bytes,
+    }
+    # Category order fixes the codes the booster splits on; inference must reuse it
+    categories = {col: list(data[col].cat.categories) for col in ('Ticker', 'Sector')}
+    save_artifacts(POOLED_DIR, 'pooled', booster, None, feature_cols, metrics=metrics,
+                   extra={"tree_method": "hist", "rounds": rounds, "categories": categories})
+    pooled_bytes = sum(os.path.getsize(os.path.join(POOLED_DIR, f)) for f in os.listdir(POOLED_DIR))
+
+    print(f"[INFO] Pooled model saved to {POOLED_DIR}")
+    print(f"  {'ticker':<16}{'pooled':>9}{'separate':>10}")
+    for ticker, row in per_ticker.items():
+        print(f"  {ticker:<16}{row['pooled']:>8.1f}%{row['separate']:>9.1f}%")
+    print(f"[INFO] Accuracy: pooled {metrics['accuracy']:.1f}% vs per-ticker mean "
+          f"{metrics['separate_accuracy']:.1f}%")
+    print(f"[INFO] Fit time: pooled {pooled_seconds:.1f}s vs per-ticker total {separate_seconds:.1f}s")
+    print(f"[INFO] Artifacts: pooled {pooled_bytes / 1e6:.2f} MB vs per-ticker boosters "
+          f"{separate_bytes / 1e6:.2f} MB")
+    return booster, metrics
+
+
+# Walk-forward Evaluation
+def walk_forward_data(ticker, start, end):
+    # Expanding thresholds: no bar's label depends on returns after it
+    prices = fetch_stock_data(ticker, start, end)
+    data = label_risk(engineer_features(prices), thresholds='expanding')
+    return prices, data
+
+
+def _fit_window(X, y, train_end, n_jobs=None, rounds=WALK_FORWARD_ROUNDS):
+    """Fit scaler and model on rows before train_end and predict the remaining rows of X"""
+    t0 = time.perf_counter()
+    scaler = StandardScaler().fit(X[:train_end])
+    params = {'objective': 'multi:softmax', 'num_class': 3, 'eval_metric': 'mlogloss'}
+    if n_jobs:
+        params['nthread'] = n_jobs
+    booster = xgb.train(params, xgb.DMatrix(scaler.transform(X[:train_end]), label=y[:train_end]),
+                        num_boost_round=rounds)
+    pred = booster.predict(xgb.DMatrix(scaler.transform(X[train_end:])))
+    return pred.astype(np.int8), time.perf_counter() - t0
+
+
+def walk_forward(tickers, start, end, workers=1, initial=WALK_FORWARD_INITIAL,
+                 step=WALK_FORWARD_STEP, report=None):
+    """Expanding-window out-of-sample evaluation of the company models.
+
+    Each ticker's model is refit every ``step`` bars on all bars before the
+    window and scores only the window, so every prediction is made by a
+    model that never saw the bar or its label. Windows of all tickers run in
+    one process pool. The pooled out-of-sample accuracy replaces
+    ``model_stats.accuracy``, and Kupiec/Christoffersen tests of the
+    historical VaR95/VaR99 over the same bars are stored under ``backtest``.
+    """
+    datasets, recorders = {}, {}
+    for ticker in tickers:
+        with track(ticker) as recorder:
+            try:
+                prices, data = walk_forward_data(ticker, start, end)
+                if len(data) <= initial:
+                    raise ValueError(f"{len(data)} bars, need more than {initial}")
+                datasets[ticker] = (prices, data)
+            except Exception as e:
+                print(f"[ERROR] Walk-forward skipped {ticker}: {e}")
+                recorder.error = str(e)
+        recorders[ticker] = recorder
+
+    # Largest training sets first, so the pool does not end on one long fit
+    tasks = sorted(((t, train_end, test_end) for t, (_, data) in datasets.items()
+                    for train_end, test_end in expanding_windows(len(data), initial, step)),
+                   key=lambda task: -task[1])
+    arrays = {t: (data[[c for c in data.columns if c != 'Risk']].to_numpy(dtype=np.float64),
+                  data['Risk'].to_numpy())
+              for t, (_, data) in datasets.items()}
+    print(f"[INFO] Walk-forward: {len(tasks)} windows over {len(datasets)} tickers "
+          f"on {workers} process{'es' if workers > 1 else ''}")
+
+    predictions = {t: np.full(len(arrays[t][1]), -1, dtype=np.int8) for t in arrays}
+    fit_seconds = dict.fromkeys(arrays, 0.0)
+    failed = {}
+
+    def collect(task, result):
+        ticker, train_end, test_end = task
+        pred, seconds = result
+        predictions[ticker][train_end:test_end] = pred
+        fit_seconds[ticker] += seconds
+
+    if workers > 1:
+        n_jobs = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_fit_window, arrays[t][0][:test_end], arrays[t][1][:train_end],
+                                   train_end, n_jobs): (t, train_end, test_end)
+                       for t, train_end, test_end in tasks}
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except Exception as e:
+                    failed[futures[future][0]] = str(e)
+    else:
+        for task in tasks:
+            ticker, train_end, test_end = task
+            try:
+                collect(task, _fit_window(arrays[ticker][0][:test_end], arrays[ticker][1][:train_end],
+                                          train_end))
+            except Exception as e:
+                failed[ticker] = str(e)
+
+    # VaR breaches over the scored bars of every ticker, tested in one padded array
+    scored = [t for t in arrays if t not in failed]
+    length = max((len(arrays[t][1]) - initial for t in scored), default=0)
+    hits = np.full((len(scored), len(VAR_LEVELS), length), np.nan)
+    for i, ticker in enumerate(scored):
+        returns = datasets[ticker][1]['Return'].to_numpy(dtype=np.float64)
+        breaches = var_breaches(returns, var_forecasts(returns))[:, initial:]
+        hits[i, :, :breaches.shape[1]] = breaches
+    tests = breach_tests(hits, np.asarray(VAR_LEVELS)[None, :])
+
+    results = {}
+    for ticker in tickers:
+        recorder = recorders[ticker]
+        if ticker in failed:
+            print(f"[ERROR] Walk-forward failed for {ticker}: {failed[ticker]}")
+            recorder.error = failed[ticker]
+        if ticker in scored:
+            i = scored.index(ticker)
+            y = arrays[ticker][1][initial:]
+            correct = int((predictions[ticker][initial:] == y).sum())
+            backtest = {
+                "method": "walk_forward",
+                "windows": len(expanding_windows(len(arrays[ticker][1]), initial, step)),
+                "n_test": int(len(y)),
+                "accuracy": 100.0 * correct / len(y),
+                "evaluatedAt": datetime.now(),
+            }
+            for level, name in enumerate(('var95', 'var99')):
+                backtest[name] = {k: (int(v[i, level]) if k in ('observations', 'breaches')
+                                      else float(v[i, level])) for k, v in tests.items()}
+            results[ticker] = backtest
+            with attach(recorder):
+                recorder.stages['fit'] = fit_seconds[ticker]
+                count_rows('scored', len(y))
+                save_model_stats(ticker, None, None, None, start, data=datasets[ticker][0],
+                                 accuracy=backtest['accuracy'], backtest=backtest)
+        if report is not None:
+            report.add(recorder.result())
+
+    print(f"  {'ticker':<16}{'accuracy':>9}{'VaR95 hit':>11}{'Kupiec p':>10}{'Chr. p':>8}"
+          f"{'VaR99 hit':>11}{'Kupiec p':>10}{'Chr. p':>8}")
+    for ticker, b in results.items():
+        print(f"  {ticker:<16}{b['accuracy']:>8.1f}%"
+              + "".join(f"{b[n]['rate'] * 100:>10.2f}%{b[n]['kupiec_p']:>10.3f}"
+                        f"{b[n]['christoffersen_p']:>8.3f}" for n in ('var95', 'var99')))
+    return results
+
+
+# Parallel Training
+# Baseline artifacts handed to each pool worker once, at start-up
+_worker_state = {}
+
+
+def _init_worker(baseline_model, scaler, n_jobs, train_options, market=None):
+    _worker_state.update(baseline_model=baseline_model, scaler=scaler, n_jobs=n_jobs,
+                         train_options=train_options, market=market)
+
+
+def _train_one(ticker, baseline_model, scaler, start, end, n_jobs=None, train_options=None,
+               market=None):
+    """Train one ticker and return a summary row (with stage timings) instead of raising"""
+    with track(ticker) as recorder:
+        try:
+            ticker_market = ticker_features(market, ticker)
+            if market is not None and ticker_market is None:
+                print(f"[WARNING] {ticker} is not in the market panel, training without market features")
+            train_company_model(ticker, baseline_model, scaler, start, end, n_jobs=n_jobs,
+                                market=ticker_market, **(train_options or {}))
+        except Exception as e:
+            print(f"[ERROR] Failed model for {ticker}: {e}")
+            recorder.error = str(e)
+    return recorder.result()
+
+
+def _train_in_worker(ticker, start, end):
+    return _train_one(ticker, _worker_state['baseline_model'], _worker_state['scaler'],
+                      start, end, n_jobs=_worker_state['n_jobs'],
+                      train_options=_worker_state['train_options'], market=_worker_state['market'])
+
+
+def print_summary(results):
+    ok = [r for r in results if r['status'] == 'ok']
+    failed = [r for r in results if r['status'] != 'ok']
+    print(f"[INFO] Training summary: {len(ok)} succeeded, {len(failed)} failed")
+    for r in sorted(results, key=lambda r: r['ticker']):
+        line = f"  - {r['ticker']}: {r['status']} ({r['seconds']:.1f}s)"
+        if r['status'] != 'ok':
+            line += f" {r['error']}"
+        print(line)
+
+
 # Main Execution
-def main(tickers, start, end):
+def main(tickers, start, end, workers=1, train_options=None, pooled=False,
+         report_path=RUN_LOG, profile=None, walk_forward_step=None, market_features=False):
+    report = RunReport('train', {"tickers": list(tickers), "start": start, "end": end,
+                                 "workers": workers, "pooled": pooled,
+                                 "walk_forward_step": walk_forward_step,
+                                 "market_features": market_features, **(train_options or {})},
+                       path=report_path)
+    status = None
     try:
-        baseline_model, scaler = train_baseline_model(start, end)
-        for ticker in tickers:
+        with profiled(profile):
+            _train_all(report, tickers, start, end, workers, train_options, pooled,
+                       walk_forward_step, market_features)
+    except Exception as e:
+        print(f"[ERROR] Training aborted: {e}")
+        status = "aborted"
+    report.finish(status)
+
+
+def _train_all(report, tickers, start, end, workers, train_options, pooled,
+               walk_forward_step=None, market_features=False):
+    # Warm the price store for every ticker in one concurrent pass
+    with report.stage('prefetch'):
+        _, failed = price_store.get_many(['^BSESN'] + list(tickers), start, end)
+    if failed:
+        print(f"[WARNING] Could not prefetch: {', '.join(failed)}")
+
+    if pooled:
+        with report.stage('pooled'):
+            train_pooled_model(tickers, start, end)
+        return
+
+    try:
+        if walk_forward_step:
+            with report.stage('walk_forward'):
+                walk_forward(tickers, start, end, workers=workers, step=walk_forward_step,
+                             report=report)
+        else:
+            _train_companies(report, tickers, start, end, workers, train_options, market_features)
+    finally:
+        # One all-tickers document for the dashboard, from whatever snapshots were written
+        with report.stage('snapshots'):
             try:
-                train_company_model(ticker, baseline_model, scaler, start, end)
+                snapshots = get_collection(SNAPSHOT_COLLECTION)
+                ensure_snapshot_indexes(snapshots)
+                if refresh_summary(snapshots):
+                    print("[INFO] Updated the all-tickers dashboard snapshot")
             except Exception as e:
-                print(f"[ERROR] Failed model for {ticker}: {e}")
-        print("[INFO] All company models trained successfully.")
+                print(f"[WARNING] Could not refresh the all-tickers snapshot: {e}")
+
+
+def build_market_features():
+    """Market features for the Sensex panel from the price store; also refreshes its dashboard matrix"""
+    features, moments = load_market(price_store)
+    if features is None:
+        print("[WARNING] ^BSESN is not cached, training without market features")
+        return None
+    print(f"[INFO] Market features for {features.columns.levshape[0]} tickers over {len(features)} bars")
+    try:
+        if write_market_snapshot(get_collection(SNAPSHOT_COLLECTION), features, moments):
+            print("[INFO] Updated the market correlation snapshot")
     except Exception as e:
-        print(f"[ERROR] Training aborted: {e}")
+        print(f"[WARNING] Could not write the market correlation snapshot: {e}")
+    return features
+
+
+def _train_companies(report, tickers, start, end, workers, train_options, market_features=False):
+    market = None
+    if market_features:
+        with report.stage('market'):
+            market = build_market_features()
+
+    train_options = train_options or {}
+    with track('^BSESN') as recorder:
+        # Incremental runs only add trees to the company models, so the baseline is reused
+        baseline = load_baseline_model(market) if train_options.get('incremental') else None
+        if baseline is None:
+            baseline = train_baseline_model(start, end, low_memory=train_options.get('low_memory', False),
+                                            market=market)
+        baseline_model, scaler = baseline
+    report.add(recorder.result())
+
+    results = []
+    if workers > 1:
+        # Split the cores between workers so XGBoost threads don't oversubscribe
+        n_jobs = max(1, (os.cpu_count() or 1) // workers)
+        print(f"[INFO] Training {len(tickers)} models on {workers} processes, {n_jobs} threads each")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(baseline_model, scaler, n_jobs, train_options, market)) as pool:
+            futures = {pool.submit(_train_in_worker, t, start, end): t for t in tickers}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker process itself died
+                    results.append({"ticker": futures[future], "status": "error",
+                                    "error": str(e), "seconds": 0.0})
+    else:
+        for ticker in tickers:
+            results.append(_train_one(ticker, baseline_model, scaler, start, end,
+                                      train_options=train_options, market=market))
+
+    for result in results:
+        report.add(result)
+    print_summary(results)
+    if all(r['status'] == 'ok' for r in results):
+        print("[INFO] All company models trained successfully.")
+
+def run(args):
+    """Entry point for parsed command-line arguments"""
+    train_options = {
+        "incremental": args.incremental,
+        "update_rounds": args.update_rounds,
+        "drift_threshold": args.drift_threshold,
+        "accuracy_drop": args.accuracy_drop,
+        "low_memory": args.low_memory,
+    }
+    main(args.tickers, args.start, args.end, workers=args.workers, train_options=train_options,
+         pooled=args.pooled, report_path=args.report, profile=args.profile,
+         walk_forward_step=args.walk_forward_step if args.walk_forward else None,
+         market_features=args.market_features)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--tickers', nargs='+',
-         default=[
-           "RELIANCE.NS","NIITLTD.NS","TCS.NS","HDFCBANK.NS","INFY.NS","HINDUNILVR.NS","BHARTIARTL.NS",
-           "KOTAKBANK.NS","ITC.NS","AXISBANK.NS","MARUTI.NS","BAJFINANCE.NS","BAJAJFINSV.NS",
-           "HCLTECH.NS","LUPIN.NS","ULTRACEMCO.NS","NTPC.NS","WIPRO.NS","M&M.NS","POWERGRID.NS",
-           "SBIN.NS","ASIANPAINT.NS","DRREDDY.NS","BAJAJ-AUTO.NS","SUNPHARMA.NS","JSWSTEEL.NS",
-           "TATAMOTORS.NS","TITAN.NS","HDFCLIFE.NS","INDUSINDBK.NS","DIVISLAB.NS","AAPL","SMSN.IL"
-         ],
-         help='List of tickers'
-    )
-    parser.add_argument('--start', type=str, default='2015-01-01', help='Start date')
-    parser.add_argument('--end', type=str, default=datetime.today().strftime('%Y-%m-%d'), help='End date')
-    args = parser.parse_args()
-    main(args.tickers, args.start, args.end)
\ No newline at end of file
+    add_train_arguments(parser)
+    run(parser.parse_args())
@@ -3,6 +3,12 @@ const express = require('express');
 const router = express.Router();
 const ctrl = require('../controllers/modelController');
 
+// GET /api/models (all tickers' headline stats)
+router.get('/', ctrl.getAllModelStats);
+
+// GET /api/models/market (correlation matrix, betas, regime)
+router.get('/market', ctrl.getMarketMatrix);
+
 // GET /api/models/:ticker
 router.get('/:ticker', ctrl.getModelStats);
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Same import root as the pipeline scripts (python -m volatisense runs from backend/)
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from volatisense.bench import synthetic_ohlcv
+from volatisense.features import FEATURE_SETS, feature_frame, lean_frame
+
+
+@pytest.mark.parametrize('feature_set', sorted(FEATURE_SETS))
+def test_lean_frame_stores_raw_prices_unchanged(feature_set):
+    bars = synthetic_ohlcv(400, seed=4)
+    # Large-cap NSE volumes and prices with paise, both beyond float32
+    bars['Volume'] = np.arange(123_456_789, 123_456_789 + len(bars), dtype=np.int64)
+    bars['Close'] = bars['Adj Close'] = (bars['Close'] * 100).round() / 100 + 10_000
+
+    lean = lean_frame(bars, feature_set)
+    full = pd.concat([bars, feature_frame(bars, feature_set)], axis=1).dropna()
+
+    assert list(lean.columns) == list(full.columns)
+    pd.testing.assert_frame_equal(lean[bars.columns], full[bars.columns])
+    assert (lean[FEATURE_SETS[feature_set]].dtypes == np.float32).all()
+    np.testing.assert_allclose(lean[FEATURE_SETS[feature_set]], full[FEATURE_SETS[feature_set]],
+                               rtol=1e-4, atol=1e-6)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+from volatisense.bench import synthetic_ohlcv
+from volatisense.features import feature_frame
+from volatisense.labels import RISK_LABELS
+from volatisense.price_store import PriceStore
+from volatisense.registry import ModelRegistry
+from volatisense.serve import FeatureCache, InferenceService
+
+HISTORY = synthetic_ohlcv(500, seed=3)
+
+
+def _downloader(ticker, start, end):
+    return HISTORY.loc[(HISTORY.index >= start) & (HISTORY.index < end)]
+
+
+def _kernel_row(bars):
+    return pd.concat([bars, feature_frame(bars, 'training')], axis=1).dropna().iloc[-1]
+
+
+def test_feature_cache_follows_appended_bars(tmp_path):
+    store = PriceStore(str(tmp_path), downloader=_downloader)
+    cache = FeatureCache(store)
+    features = list(_kernel_row(HISTORY).index)
+
+    ends = (HISTORY.index[300], HISTORY.index[420], HISTORY.index[-1] + pd.Timedelta(days=1))
+    for stamp, end in enumerate(ends, start=1):
+        bars = store.get('TEST.NS', HISTORY.index[0], end)
+        # Rewrites within one mtime tick would otherwise look unchanged
+        os.utime(tmp_path / 'TEST.NS.parquet', (stamp, stamp))
+        row, as_of = cache.latest('TEST.NS', features)
+        expected = _kernel_row(bars)
+        assert as_of == expected.name.strftime('%Y-%m-%d')
+        np.testing.assert_allclose(row, expected.to_numpy(dtype=float), rtol=1e-6)
+
+
+
+def test_feature_cache_replays_a_corrected_last_bar(tmp_path):
+    history = HISTORY.copy()
+    store = PriceStore(str(tmp_path), downloader=lambda t, s, e: history.loc[(history.index >= s)
+                                                                             & (history.index < e)])
+    cache = FeatureCache(store)
+    features = list(_kernel_row(history).index)
+    # Cached through a Friday, so the next fetch up to Monday only re-downloads that bar
+    friday = next(i for i in range(300, 320) if history.index[i].dayofweek == 4)
+    ends = (history.index[friday + 1],                          # first cached copy
+            history.index[friday] + pd.Timedelta(days=3),       # corrected bar only
+            history.index[friday + 60])                         # corrected again, plus new bars
+
+    for stamp, end in enumerate(ends, start=1):
+        if stamp > 1:
+            # An intraday bar finalised after it was cached
+            last = store.cached('TEST.NS').index[-1]
+            history.loc[last, ['Close', 'Adj Close']] *= 1.03
+        bars = store.get('TEST.NS', history.index[0], end)
+        os.utime(tmp_path / 'TEST.NS.parquet', (stamp, stamp))
+        row, as_of = cache.latest('TEST.NS', features)
+        expected = _kernel_row(bars)
+        assert as_of == expected.name.strftime('%Y-%m-%d')
+        np.testing.assert_allclose(row, expected.to_numpy(dtype=float), rtol=1e-6)
+
+def test_service_scores_from_an_injected_cold_registry(tmp_path):
+    store = PriceStore(str(tmp_path / 'cache'), downloader=_downloader)
+    store.get('TEST.NS', HISTORY.index[0], HISTORY.index[-1] + pd.Timedelta(days=1))
+    data = pd.concat([HISTORY, feature_frame(HISTORY, 'training')], axis=1).dropna()
+    features = list(data.columns)
+    scaler = StandardScaler().fit(data[features])
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2, objective='multi:softmax', num_class=3)
+    model.fit(scaler.transform(data[features]), np.arange(len(data)) % 3)
+    ModelRegistry(str(tmp_path / 'models')).save('TEST.NS', model, scaler, features)
+
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    assert len(registry) == 0
+    service = InferenceService(registry, store)
+    assert service.registry is registry
+
+    result = service.predict_latest(['TEST.NS'])[0]
+    assert result['riskLevel'] in RISK_LABELS
+    assert result['asOf'] == data.index[-1].strftime('%Y-%m-%d')
+    assert registry.metrics['misses'] == 1
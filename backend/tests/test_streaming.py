@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from volatisense.bench import synthetic_ohlcv
+from volatisense.features import feature_frame
+from volatisense.streaming import StreamingFeatures
+
+# Seeded, so the parity checks do not depend on what is in a local price cache
+HISTORIES = [(f'seed{seed}', synthetic_ohlcv(n_bars, seed=seed))
+             for n_bars, seed in ((600, 7), (2520, 11), (60, 5))]
+
+
+def _assert_rows_equal(expected, actual):
+    np.testing.assert_allclose(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-6, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('name,bars', HISTORIES, ids=[name for name, _ in HISTORIES])
+def test_replay_matches_kernel_after_warm_up(name, bars):
+    expected = feature_frame(bars, 'training')
+    actual = StreamingFeatures().extend(bars)
+    complete = ~expected.isna().any(axis=1)
+    assert complete.sum() > 0
+    _assert_rows_equal(expected[complete], actual[complete])
+
+
+@pytest.mark.parametrize('name,bars', HISTORIES, ids=[name for name, _ in HISTORIES])
+def test_each_row_is_the_kernel_on_the_history_so_far(name, bars):
+    rows = StreamingFeatures().extend(bars)
+    # Short histories cover the warm-up of every window and EMA
+    for cut in (1, 2, 5, 14, 26, 35, 100, len(bars)):
+        if cut <= len(bars):
+            _assert_rows_equal(feature_frame(bars.iloc[:cut], 'training').iloc[[-1]], rows.iloc[[cut - 1]])
+
+
+def test_extend_feeds_only_new_bars():
+    bars = synthetic_ohlcv(400, seed=2)
+    engine = StreamingFeatures()
+    head = engine.extend(bars.iloc[:300])
+    tail = engine.extend(bars)
+    assert len(tail) == 100
+    _assert_rows_equal(StreamingFeatures().extend(bars), pd.concat([head, tail]))
@@ -0,0 +1,64 @@
+import types
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from volatisense.bench import synthetic_downloader
+from volatisense.cli import TRAIN_SCRIPT, load_script
+from volatisense.market import MARKET_FEATURES
+from volatisense.price_store import PriceStore
+from volatisense.registry import ModelRegistry
+
+START = '2018-01-01'
+
+
+class _Collection:
+    def __init__(self):
+        self.documents = {}
+
+    def find_one(self, filter, projection=None):
+        return self.documents.get(tuple(sorted(filter.items())))
+
+    def update_one(self, filter, update, upsert=False):
+        self.documents[tuple(sorted(filter.items()))] = update['$set']
+        return types.SimpleNamespace(modified_count=0, upserted_id=1)
+
+
+@pytest.fixture
+def training(tmp_path, monkeypatch):
+    module = load_script('train_update', TRAIN_SCRIPT)
+    collection = _Collection()
+    monkeypatch.setattr(module, 'price_store', PriceStore(str(tmp_path / 'prices'), synthetic_downloader))
+    monkeypatch.setattr(module, 'model_registry', ModelRegistry(str(tmp_path / 'models')))
+    monkeypatch.setattr(module, 'BASELINE_DIR', str(tmp_path / 'baseline'))
+    monkeypatch.setattr(module, 'get_collection', lambda name: collection)
+    warnings.simplefilter('ignore')
+    return module
+
+
+def _market(end):
+    index = pd.bdate_range(START, end)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(size=(len(index), len(MARKET_FEATURES))),
+                        index=index, columns=MARKET_FEATURES)
+
+
+def test_feature_change_forces_a_full_retrain(training):
+    baseline_model, scaler = training.train_baseline_model(START, '2024-01-01')
+    training.train_company_model('SYN.NS', baseline_model, scaler, START, '2024-01-01')
+    assert training.model_registry.manifest('SYN.NS')['mode'] == 'full'
+
+    # Same ticker a quarter later, now with the market features
+    training.train_company_model('SYN.NS', baseline_model, scaler, START, '2024-04-01',
+                                 incremental=True, market=_market('2024-04-01'))
+    manifest = training.model_registry.manifest('SYN.NS')
+    assert manifest['mode'] == 'full'
+    assert set(MARKET_FEATURES) <= set(manifest['features'])
+
+    # With the features unchanged the next run is an incremental update again
+    training.train_company_model('SYN.NS', baseline_model, scaler, START, '2024-06-01',
+                                 incremental=True, market=_market('2024-06-01'),
+                                 drift_threshold=np.inf, accuracy_drop=np.inf)
+    assert training.model_registry.manifest('SYN.NS')['mode'] == 'incremental'
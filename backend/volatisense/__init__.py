@@ -0,0 +1 @@
+"""Shared helpers for the VolatiSense ingest and training scripts."""
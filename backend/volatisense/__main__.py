@@ -0,0 +1,3 @@
+from volatisense.cli import main
+
+main()
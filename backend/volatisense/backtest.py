@@ -0,0 +1,100 @@
+"""Walk-forward splits and VaR-breach backtests.
+
+``expanding_windows`` yields the (train_end, test_end) row bounds of an
+expanding-window evaluation: fit on every bar before ``train_end``, score the
+bars up to ``test_end``, then grow the training set by one step.
+
+``breach_tests`` runs the Kupiec proportion-of-failures and Christoffersen
+independence tests along the last axis of a 0/1 breach array, so every
+ticker and VaR level is tested in one set of array operations. Missing bars
+are NaN, which lets series of different lengths share one padded array.
+"""
+import numpy as np
+from scipy.special import xlogy
+from scipy.stats import chi2
+
+from volatisense.features import as_array, rolling_quantiles
+
+VAR_LEVELS = (0.05, 0.01)
+VAR_WINDOW = 250  # One trading year of returns, as in the model_stats VaR
+
+
+def expanding_windows(n, initial, step):
+    """(train_end, test_end) row bounds covering bars initial..n in steps of ``step``"""
+    if n <= initial:
+        return []
+    return [(int(a), int(min(a + step, n))) for a in range(initial, n, step)]
+
+
+def var_forecasts(returns, levels=VAR_LEVELS, window=VAR_WINDOW):
+    """Historical VaR per bar from the ``window`` returns before it, shape (len(levels), n)"""
+    quantiles = rolling_quantiles(as_array(returns), window, levels)
+    forecasts = np.full_like(quantiles, np.nan)
+    # The quantile through bar t-1 is the forecast for bar t
+    forecasts[:, 1:] = quantiles[:, :-1]
+    return forecasts
+
+
+def var_breaches(returns, forecasts):
+    """1.0 where the return fell below its VaR, 0.0 where it did not, NaN where either is missing"""
+    returns = as_array(returns)
+    hits = (returns < forecasts).astype(np.float64)
+    hits[np.isnan(forecasts) | np.isnan(returns)] = np.nan
+    return hits
+
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+def _loglik(k, n, p):
+    # Bernoulli log-likelihood of k hits in n trials; xlogy makes 0 * log(0) zero
+    return xlogy(n - k, 1 - p) + xlogy(k, p)
+
+
+def breach_tests(hits, levels):
+    """Kupiec POF and Christoffersen independence tests along the last axis.
+
+    ``hits`` is a (..., T) array of 0/1 with NaN for missing bars and
+    ``levels`` the expected breach rate, broadcast against ``hits.shape[:-1]``.
+    Returns a dict of arrays of that shape. The conditional-coverage statistic
+    is the sum of the two and has two degrees of freedom.
+    """
+    hits = np.asarray(hits, dtype=np.float64)
+    p = np.broadcast_to(np.asarray(levels, dtype=np.float64), hits.shape[:-1])
+    valid = ~np.isnan(hits)
+    h = np.where(valid, hits, 0.0) > 0
+    n = valid.sum(axis=-1)
+    x = h.sum(axis=-1)
+    rate = _ratio(x, n)
+    lr_pof = -2 * (_loglik(x, n, p) - _loglik(x, n, rate))
+
+    # Transition counts between consecutive observed bars
+    pair = valid[..., :-1] & valid[..., 1:]
+    prev, cur = h[..., :-1], h[..., 1:]
+    n00 = (pair & ~prev & ~cur).sum(axis=-1)
+    n01 = (pair & ~prev & cur).sum(axis=-1)
+    n10 = (pair & prev & ~cur).sum(axis=-1)
+    n11 = (pair & prev & cur).sum(axis=-1)
+    pi01 = _ratio(n01, n00 + n01)
+    pi11 = _ratio(n11, n10 + n11)
+    pi = _ratio(n01 + n11, n00 + n01 + n10 + n11)
+    lr_ind = -2 * (_loglik(n01 + n11, n00 + n01 + n10 + n11, pi)
+                   - _loglik(n01, n00 + n01, pi01) - _loglik(n11, n10 + n11, pi11))
+
+    # Rounding can leave tiny negative statistics
+    lr_pof = np.maximum(lr_pof, 0.0)
+    lr_ind = np.maximum(lr_ind, 0.0)
+    lr_cc = lr_pof + lr_ind
+    return {
+        "observations": n,
+        "breaches": x,
+        "rate": rate,
+        "expected": p,
+        "kupiec_lr": lr_pof,
+        "kupiec_p": chi2.sf(lr_pof, 1),
+        "christoffersen_lr": lr_ind,
+        "christoffersen_p": chi2.sf(lr_ind, 1),
+        "conditional_coverage_lr": lr_cc,
+        "conditional_coverage_p": chi2.sf(lr_cc, 2),
+    }
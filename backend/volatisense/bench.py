@@ -0,0 +1,525 @@
+"""Offline benchmarks for the feature pipeline.
+
+Run from ``backend/``:
+
+    python -m volatisense.bench --tickers 34 --years 10 --json bench.json
+    python -m volatisense.bench --compare bench.json   # flag regressions against a saved run
+
+Prices are synthetic, so no network or database is needed. The ``legacy_*``
+functions are the pandas/ta implementations the scripts used before the
+shared kernel; they are kept here as the timing and accuracy reference.
+The pipeline suite times the scripts' own functions with a temporary price
+store, model registry and an in-memory stand-in for ``model_stats``.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from volatisense.cli import INGEST_SCRIPT, TRAIN_SCRIPT, add_bench_arguments, load_script
+from volatisense.features import FEATURE_SETS, feature_frame, rolling_quantiles
+from volatisense.instrument import track
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def synthetic_ohlcv(n_bars, seed=0, start='2015-01-01', s0=1000.0, mu=0.08, sigma=0.25):
+    """Geometric-Brownian OHLCV history on business days"""
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / 252
+    log_ret = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal(n_bars)
+    close = s0 * np.exp(np.cumsum(log_ret))
+    open_ = np.concatenate([[s0], close[:-1]])
+    spread = np.abs(rng.normal(0, sigma * np.sqrt(dt) / 2, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(100_000, 5_000_000, n_bars).astype(float)
+    index = pd.bdate_range(start, periods=n_bars, name='Date')
+    return pd.DataFrame({'Adj Close': close, 'Close': close, 'High': high, 'Low': low,
+                         'Open': open_, 'Volume': volume}, index=index)
+
+
+# Reference implementations (pre-kernel)
+def legacy_compute_technical_indicators(df):
+    import ta
+
+    result = df.copy()
+    result['Return'] = result['Close'].pct_change()
+    result['MA_5'] = result['Close'].rolling(window=5).mean()
+    result['MA_10'] = result['Close'].rolling(window=10).mean()
+    result['MA_50'] = result['Close'].rolling(window=50).mean()
+    result['MA_200'] = result['Close'].rolling(window=200).mean()
+    result['STD_5'] = result['Close'].rolling(window=5).std()
+    result['Range'] = result['High'] - result['Low']
+    result['Range_Ratio'] = np.where(result['Close'] != 0,
+                                     (result['High'] - result['Low']) / result['Close'], 0)
+    result['Price_to_MA5'] = np.where(result['MA_5'] != 0, result['Close'] / result['MA_5'] - 1, 0)
+    result['Price_to_MA10'] = np.where(result['MA_10'] != 0, result['Close'] / result['MA_10'] - 1, 0)
+    result['Momentum'] = result['Close'] - result['Close'].shift(5)
+    result['Volume_Change'] = result['Volume'].pct_change()
+    result['VaR_95'] = result['Return'].rolling(100).quantile(0.05)
+    result['Volatility'] = result['Return'].rolling(20).std()
+    result['RSI'] = ta.momentum.RSIIndicator(result['Close'], window=14).rsi()
+    macd = ta.trend.MACD(result['Close'])
+    result['MACD'] = macd.macd()
+    result['MACD_Signal'] = macd.macd_signal()
+    ma20 = result['Close'].rolling(20).mean()
+    std20 = result['Close'].rolling(20).std()
+    result['BB_Upper'] = ma20 + 2 * std20
+    result['BB_Lower'] = ma20 - 2 * std20
+    result['ATR'] = ta.volatility.AverageTrueRange(
+        result['High'], result['Low'], result['Close'], window=14
+    ).average_true_range()
+    return result.replace([np.inf, -np.inf], np.nan)
+
+
+def legacy_engineer_features(data):
+    data = data.copy()
+    close = data['Close']
+    data['Return'] = close.pct_change()
+    data['Volatility'] = data['Return'].rolling(window=5).std()
+    data['SMA_5'] = close.rolling(window=5).mean()
+    data['SMA_10'] = close.rolling(window=10).mean()
+    data['EMA_5'] = close.ewm(span=5, adjust=False).mean()
+    data['EMA_10'] = close.ewm(span=10, adjust=False).mean()
+    exp1 = close.ewm(span=12, adjust=False).mean()
+    exp2 = close.ewm(span=26, adjust=False).mean()
+    data['MACD'] = exp1 - exp2
+    data['MACD_Signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    data['RSI'] = 100 - (100 / (1 + gain / loss))
+    return data
+
+
+def _time(fn, frames, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for df in frames:
+            fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _max_rel_error(expected, actual, columns):
+    worst = 0.0
+    for col in columns:
+        if col not in expected.columns:
+            continue  # Column added after the legacy implementation
+        x = expected[col].to_numpy(dtype=float)
+        y = actual[col].to_numpy(dtype=float)
+        both = ~(np.isnan(x) | np.isnan(y))
+        if not np.array_equal(np.isnan(x), np.isnan(y)):
+            return float('inf')
+        if both.any():
+            scale = np.maximum(np.abs(x[both]), 1e-12)
+            worst = max(worst, float(np.max(np.abs(x[both] - y[both]) / scale)))
+    return worst
+
+
+def bench_features(n_tickers=34, years=10, repeat=3):
+    frames = [synthetic_ohlcv(252 * years, seed=i) for i in range(n_tickers)]
+    cases = [
+        ('ingest', legacy_compute_technical_indicators),
+        ('training', legacy_engineer_features),
+    ]
+    if importlib.util.find_spec('ta') is None:
+        # Only the ingest reference needs ta, and the runtime image no longer installs it
+        print("[WARNING] ta is not installed, skipping the legacy ingest comparison")
+        cases = cases[1:]
+    results = []
+    for feature_set, legacy in cases:
+        legacy_s = _time(legacy, frames, repeat)
+        kernel_s = _time(lambda df: feature_frame(df, feature_set), frames, repeat)
+        error = _max_rel_error(legacy(frames[0]), feature_frame(frames[0], feature_set),
+                               FEATURE_SETS[feature_set])
+        results.append({
+            'feature_set': feature_set,
+            'legacy_s': legacy_s,
+            'kernel_s': kernel_s,
+            'speedup': legacy_s / kernel_s,
+            'max_rel_error': error,
+        })
+        print(f"[BENCH] {feature_set:<8} legacy {legacy_s * 1000:8.1f} ms | "
+              f"kernel {kernel_s * 1000:8.1f} ms | x{legacy_s / kernel_s:5.1f} | "
+              f"max rel err {error:.1e}")
+    return results
+
+
+def bench_rolling_quantiles(n_tickers=34, years=10, repeat=3, window=100, qs=(0.01, 0.05, 0.10)):
+    returns = [synthetic_ohlcv(252 * years, seed=i)['Close'].pct_change() for i in range(n_tickers)]
+    arrays = [r.to_numpy() for r in returns]
+
+    def per_level(r):
+        rolling = r.rolling(window)
+        return [rolling.quantile(q) for q in qs]
+
+    pandas_s = _time(per_level, returns, repeat)
+    one_pass_s = _time(lambda x: rolling_quantiles(x, window, qs), arrays, repeat)
+    print(f"[BENCH] rolling quantiles x{len(qs)}: pandas {pandas_s * 1000:8.1f} ms | "
+          f"one pass {one_pass_s * 1000:8.1f} ms")
+    return {'pandas_s': pandas_s, 'one_pass_s': one_pass_s}
+
+
+def synthetic_downloader(ticker, start, end):
+    """Drop-in for yf_downloader returning reproducible synthetic bars"""
+    n_bars = len(pd.bdate_range(start, end, inclusive='left'))
+    return synthetic_ohlcv(n_bars, seed=zlib.crc32(ticker.encode()), start=start)
+
+
+@contextlib.contextmanager
+def _patched(module, **attributes):
+    """Swap module globals for the block; scripts are shared through sys.modules"""
+    saved = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield module
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+class _LocalCollection:
+    """Serves the reads and writes save_model_stats makes (stats and snapshots), without a database"""
+
+    def __init__(self):
+        self.documents = {}
+
+    @staticmethod
+    def _key(filter):
+        return tuple(sorted(filter.items()))
+
+    def find_one(self, filter, projection=None):
+        # Callers only read fields they asked for, so the projection can be ignored
+        document = self.documents.get(self._key(filter))
+        return dict(document) if document is not None else None
+
+    def update_one(self, filter, update, upsert=False):
+        key = self._key(filter)
+        existed = key in self.documents
+        self.documents[key] = {**self.documents.get(key, {}), **filter, **update.get('$set', {})}
+        return types.SimpleNamespace(matched_count=int(existed), modified_count=int(existed),
+                                     upserted_id=None if existed else 1)
+
+
+def _checked(ticker, fn, *args):
+    """Run one training step and raise on any error it handled (and only printed) itself"""
+    with track(ticker) as recorder:
+        result = fn(*args)
+    if recorder.error:
+        raise RuntimeError(f"{fn.__name__} failed for {ticker}: {recorder.error}")
+    return result
+
+
+def bench_pipeline(n_tickers=34, years=10, repeat=3, train_tickers=3):
+    """Time the ingest and training scripts' hot paths on synthetic histories"""
+    from volatisense.price_store import PriceStore
+    from volatisense.registry import ModelRegistry
+    from volatisense.stats import build_model_stats
+
+    ingest = load_script('fetch_latest_data', INGEST_SCRIPT)
+    training = load_script('train_update', TRAIN_SCRIPT)
+
+    frames = [synthetic_ohlcv(252 * years, seed=i) for i in range(n_tickers)]
+    indicators = [ingest.compute_technical_indicators(df).dropna() for df in frames]
+    engineered = [training.engineer_features(df) for df in frames]
+    cases = [
+        ('compute_technical_indicators', ingest.compute_technical_indicators, frames),
+        ('engineer_features', training.engineer_features, frames),
+        ('label_risk', training.label_risk, engineered),
+        ('assign_risk_label', lambda df: ingest.assign_risk_label(df['Return']), indicators),
+        ('build_model_stats', lambda df: build_model_stats('SYN', df, 0.0), frames),
+    ]
+    results = []
+    for name, fn, inputs in cases:
+        seconds = _time(fn, inputs, repeat)
+        results.append({'name': name, 'seconds': seconds, 'calls': len(inputs),
+                        'per_call_ms': seconds / len(inputs) * 1000})
+
+    # Training runs end to end against local stand-ins for every external dependency
+    start = frames[0].index[0].strftime('%Y-%m-%d')
+    end = (frames[0].index[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    tickers = [f"SYN{i:02d}" for i in range(train_tickers)]
+    collection = _LocalCollection()
+    with tempfile.TemporaryDirectory() as tmp, _patched(
+            training,
+            price_store=PriceStore(os.path.join(tmp, 'prices'), downloader=synthetic_downloader),
+            model_registry=ModelRegistry(os.path.join(tmp, 'models')),
+            BASELINE_DIR=os.path.join(tmp, 'baseline'),
+            get_collection=lambda name: collection):
+        training.price_store.get_many(['^BSESN'] + tickers, start, end)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            baseline_model, scaler = _checked('^BSESN', training.train_baseline_model, start, end)
+            baseline_s = time.perf_counter() - t0
+            company_s = _time(lambda t: _checked(t, training.train_company_model, t, baseline_model,
+                                                 scaler, start, end),
+                              tickers, repeat)
+    results.append({'name': 'train_baseline_model', 'seconds': baseline_s, 'calls': 1,
+                    'per_call_ms': baseline_s * 1000})
+    results.append({'name': 'train_company_model', 'seconds': company_s, 'calls': len(tickers),
+                    'per_call_ms': company_s / len(tickers) * 1000})
+
+    for row in results:
+        print(f"[BENCH] {row['name']:<30} {row['seconds'] * 1000:9.1f} ms total | "
+              f"{row['per_call_ms']:8.2f} ms per call (x{row['calls']})")
+    return results
+
+
+def _peak_mb(fn, df):
+    """Peak traced allocation (numpy buffers included) while fn(df) runs, and its result's size"""
+    tracemalloc.start()
+    try:
+        result = fn(df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6, result.memory_usage(deep=True).sum() / 1e6
+
+
+def bench_memory(years=10):
+    """Per-ticker peak memory of the feature step, default vs --low-memory"""
+    ingest = load_script('fetch_latest_data', INGEST_SCRIPT)
+    training = load_script('train_update', TRAIN_SCRIPT)
+
+    def ingest_default(df):
+        frame = ingest.compute_technical_indicators(df)
+        frame.dropna(inplace=True)
+        return frame
+
+    cases = [
+        ('ingest', ingest_default, lambda df: ingest.compute_technical_indicators(df, low_memory=True)),
+        ('training', training.engineer_features, lambda df: training.engineer_features(df, True)),
+    ]
+    results = []
+    for name, default, lean in cases:
+        df = synthetic_ohlcv(252 * years, seed=0)
+        default_peak, default_size = _peak_mb(default, df)
+        lean_peak, lean_size = _peak_mb(lean, df)
+        results.append({'name': name, 'default_peak_mb': default_peak, 'low_memory_peak_mb': lean_peak,
+                        'default_frame_mb': default_size, 'low_memory_frame_mb': lean_size})
+        print(f"[BENCH] {name:<8} peak {default_peak:6.2f} MB -> {lean_peak:6.2f} MB | "
+              f"frame {default_size:6.2f} MB -> {lean_size:6.2f} MB ({252 * years} bars)")
+    return results
+
+
+def _timings(results, prefix=''):
+    """Flatten a results tree into {name: seconds} for every ``*_s``/``seconds`` entry"""
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if isinstance(value, (int, float)) and (key.endswith('_s') or key == 'seconds'):
+                flat[prefix + key] = float(value)
+            elif isinstance(value, (dict, list)):
+                flat.update(_timings(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for item in results:
+            label = (item.get('name') or item.get('feature_set')) if isinstance(item, dict) else None
+            if label:
+                flat.update(_timings(item, f"{prefix}{label}."))
+    return flat
+
+
+def compare(previous, current, tolerance=0.10):
+    """Print timing ratios against a previous run; returns the regressed names"""
+    old, new = _timings(previous), _timings(current)
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        if name.startswith('meta.') or 'legacy' in name or 'pandas' in name:
+            continue  # Reference implementations, not the code under test
+        ratio = new[name] / old[name] if old[name] > 0 else float('inf')
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"[BENCH] {name:<50} {old[name] * 1000:9.1f} -> {new[name] * 1000:9.1f} ms "
+              f"(x{ratio:4.2f}){flag}")
+    return regressions
+
+
+def _meta(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import xgboost
+    return {
+        'commit': commit,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgboost.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'params': {'tickers': args.tickers, 'years': args.years, 'repeat': args.repeat},
+    }
+
+
+def _ingest_frame(df, ticker):
+    """Frame shaped like the rows fetch_and_insert_data writes to sensex_data"""
+    from volatisense.labels import risk_codes, risk_labels
+
+    frame = pd.concat([df, feature_frame(df, 'ingest')], axis=1).dropna().reset_index()
+    codes = risk_codes(frame['Return'])
+    frame['Risk_Code'] = codes
+    frame['Risk_Label'] = risk_labels(codes)
+    frame['High_Risk'] = (codes == 2).astype(int)
+    frame['Ticker'] = ticker
+    return frame
+
+
+def bench_storage(n_tickers=34, years=10, repeat=3, mongo_uri=None):
+    """Compare the daily-document and monthly-bucket layouts of sensex_data.
+
+    Sizes are raw BSON bytes. Read latency goes through a real server when
+    ``mongo_uri`` is given, otherwise through mongomock (in-process).
+    """
+    import bson
+
+    from volatisense import storage
+
+    if mongo_uri:
+        import pymongo
+        db = pymongo.MongoClient(mongo_uri)['volatisense_bench']
+    else:
+        import mongomock
+        db = mongomock.MongoClient()['volatisense_bench']
+    rows, buckets = db['rows'], db['buckets']
+    rows.drop()
+    buckets.drop()
+    if mongo_uri:
+        # mongomock never uses indexes and checks unique ones on every insert
+        storage.ensure_sensex_indexes(rows)
+        storage.ensure_bucket_indexes(buckets)
+
+    row_bytes = bucket_bytes = n_rows = n_buckets = 0
+    tickers = [f"SYN{i:02d}" for i in range(n_tickers)]
+    for i, ticker in enumerate(tickers):
+        frame = _ingest_frame(synthetic_ohlcv(252 * years, seed=i), ticker)
+        # Bulk-load both layouts; this benchmark is about size and reads, not the write path
+        row_docs = frame.to_dict(orient='records')
+        hashes = storage.row_hashes(frame, [c for c in frame.columns if c not in ('Date', 'Ticker')])
+        for doc, row_hash in zip(row_docs, hashes.tolist()):
+            doc['Row_Hash'] = row_hash
+        rows.insert_many(row_docs)
+        buckets.insert_many(list(storage.frame_to_buckets(frame, ticker)))
+        for doc in rows.find({"Ticker": ticker}, {"_id": 0}):
+            row_bytes += len(bson.encode(doc))
+            n_rows += 1
+        for doc in buckets.find({"Ticker": ticker}, {"_id": 0}):
+            bucket_bytes += len(bson.encode(doc))
+            n_buckets += 1
+
+    one_year = frame['Date'].iloc[-1] - pd.DateOffset(years=1)
+    rows_s = _time(lambda t: storage.read_rows(rows, t, start=one_year), tickers, repeat)
+    buckets_s = _time(lambda t: storage.read_buckets(buckets, t, start=one_year), tickers, repeat)
+    backend = 'mongod' if mongo_uri else 'mongomock'
+    print(f"[BENCH] storage: rows {n_rows} docs / {row_bytes / 1e6:.1f} MB BSON | "
+          f"buckets {n_buckets} docs / {bucket_bytes / 1e6:.1f} MB BSON")
+    print(f"[BENCH] last-year read x{n_tickers} ({backend}): rows {rows_s * 1000:8.1f} ms | "
+          f"buckets {buckets_s * 1000:8.1f} ms")
+    return {'row_docs': n_rows, 'row_bytes': row_bytes, 'bucket_docs': n_buckets,
+            'bucket_bytes': bucket_bytes, 'rows_read_s': rows_s, 'buckets_read_s': buckets_s,
+            'backend': backend}
+
+
+def bench_risk(n_tickers=34, years=10, repeat=3, paths=100_000):
+    """Time the VaR estimators on one year of synthetic returns for every ticker"""
+    from volatisense import risk
+
+    returns = np.column_stack([
+        np.diff(np.log(synthetic_ohlcv(252 * years, seed=i)['Close'].to_numpy()))[-risk.LOOKBACK:]
+        for i in range(n_tickers)
+    ])
+    weights = np.full(n_tickers, 1.0 / n_tickers)
+    cases = [
+        ('parametric', lambda: risk.parametric_var(returns, method='cornish_fisher')),
+        ('filtered_ewma', lambda: risk.filtered_var(returns, model='ewma')),
+        ('filtered_garch', lambda: risk.filtered_var(returns, model='garch')),
+        ('monte_carlo', lambda: risk.simulate_var(returns, paths=paths, weights=weights, seed=0)),
+        ('portfolio', lambda: risk.portfolio_var(returns, weights)),
+    ]
+    results = []
+    for name, fn in cases:
+        seconds = _time(lambda _: fn(), [None], repeat)
+        results.append({'name': name, 'seconds': seconds})
+        print(f"[BENCH] risk {name:<16} {seconds * 1000:9.1f} ms ({n_tickers} tickers"
+              + (f", {paths} paths)" if name == 'monte_carlo' else ")"))
+    return results
+
+
+def bench_market(n_tickers=34, years=10, repeat=3):
+    """Time the rolling correlation matrices behind the market features against recomputing them"""
+    from volatisense import market
+
+    closes = {market.INDEX_TICKER: synthetic_ohlcv(252 * years, seed=n_tickers)['Close']}
+    closes.update((f"T{i}", synthetic_ohlcv(252 * years, seed=i)['Close']) for i in range(n_tickers))
+    panel = pd.DataFrame(closes).pct_change().iloc[1:]
+    values = panel.to_numpy()
+    window = market.CORR_WINDOW
+
+    def recompute(_):
+        # The whole window's matrix again at every bar
+        return [np.corrcoef(values[t - window:t], rowvar=False) for t in range(window, len(values) + 1)]
+
+    incremental_s = _time(lambda _: market.market_features(panel), [None], repeat)
+    recompute_s = _time(recompute, [None], repeat)
+    pandas_s = _time(lambda _: panel.rolling(window).corr(), [None], repeat)
+    features, _ = market.market_features(panel)
+    error = np.nanmax(np.abs(features.xs('Corr_Index', axis=1, level=1).to_numpy()
+                             - panel.rolling(window).corr(panel[market.INDEX_TICKER]).to_numpy()))
+    print(f"[BENCH] market {n_tickers + 1} tickers: incremental {incremental_s * 1000:8.1f} ms | "
+          f"recompute {recompute_s * 1000:8.1f} ms | pandas rolling corr {pandas_s * 1000:8.1f} ms | "
+          f"max abs err {error:.1e}")
+    return {'incremental_s': incremental_s, 'recompute_s': recompute_s, 'pandas_s': pandas_s,
+            'max_abs_error': float(error)}
+
+
+def run(args):
+    """Run the suites selected by parsed command-line arguments"""
+    results = {'meta': _meta(args)}
+    results['features'] = bench_features(args.tickers, args.years, args.repeat)
+    results['rolling_quantiles'] = bench_rolling_quantiles(args.tickers, args.years, args.repeat)
+    results['pipeline'] = bench_pipeline(args.tickers, args.years, args.repeat, args.train_tickers)
+    results['memory'] = bench_memory(args.years)
+    results['risk'] = bench_risk(args.tickers, args.years, args.repeat)
+    results['market'] = bench_market(args.tickers, args.years, args.repeat)
+    if args.storage:
+        results['storage'] = bench_storage(args.tickers, args.years, args.repeat, args.mongo_uri)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"[WARNING] {len(regressions)} timings regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_bench_arguments(parser)
+    run(parser.parse_args())
@@ -0,0 +1,192 @@
+"""Single entry point for the pipeline: ``python -m volatisense <command>``.
+
+Run from ``backend/``:
+
+    python -m volatisense ingest --pipelined
+    python -m volatisense train --workers 4 --incremental
+    python -m volatisense stats
+    python -m volatisense bench --json bench.json
+
+Only the standard library is imported up front. Each command imports what it
+needs when it runs, so ``--help`` and argument errors return at once, and
+``stats`` never loads XGBoost, scikit-learn, SciPy or yfinance. The scripts'
+own ``__main__`` blocks build their parsers from the same functions.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+from volatisense import defaults
+from volatisense.instrument import RUN_LOG
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+INGEST_SCRIPT = os.path.join('dataset', 'fetch_latest_data.py')
+TRAIN_SCRIPT = os.path.join('model', 'train_update.py')
+
+
+def load_script(name, relpath):
+    """Import one of the pipeline scripts, which live outside the package.
+
+    The module is registered under ``name`` so pool workers can unpickle
+    references to its functions.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BACKEND_DIR, relpath))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def _add_run_arguments(parser):
+    parser.add_argument('--report', default=RUN_LOG, help='JSON-lines run report to append to')
+    parser.add_argument('--profile', default=None,
+                        help='Write a cProfile dump here (or a py-spy flame graph for *.svg)')
+
+
+def add_ingest_arguments(parser):
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent downloads')
+    parser.add_argument('--layout', choices=['rows', 'buckets', 'both'], default='rows',
+                        help='sensex_data layout: daily documents, monthly buckets, or both')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='float32 indicator frames without intermediate copies')
+    parser.add_argument('--label-thresholds', choices=defaults.THRESHOLD_MODES, default='full',
+                        help='Risk-label quantiles over the full history, or rolling/expanding '
+                             '(no look-ahead; old rows keep their labels)')
+    parser.add_argument('--label-window', type=int, default=defaults.LABEL_WINDOW,
+                        help='Bars for rolling thresholds')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Overlap fetch, indicator and write stages across tickers')
+    parser.add_argument('--compute-workers', type=int, default=2,
+                        help='Indicator threads in --pipelined mode')
+    parser.add_argument('--write-workers', type=int, default=2,
+                        help='MongoDB writer threads in --pipelined mode')
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help='Frames buffered between --pipelined stages')
+    _add_run_arguments(parser)
+
+
+def add_train_arguments(parser):
+    parser.add_argument('--tickers', nargs='+', default=defaults.SENSEX_TICKERS,
+                        help='List of tickers')
+    parser.add_argument('--start', type=str, default='2015-01-01', help='Start date')
+    parser.add_argument('--end', type=str, default=datetime.today().strftime('%Y-%m-%d'),
+                        help='End date')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel training processes')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Add trees on new bars only; full retrain on drift or accuracy loss')
+    parser.add_argument('--update-rounds', type=int, default=defaults.UPDATE_ROUNDS,
+                        help='Trees added per update')
+    parser.add_argument('--drift-threshold', type=float, default=defaults.DRIFT_THRESHOLD,
+                        help='Return PSI that forces a full retrain')
+    parser.add_argument('--accuracy-drop', type=float, default=defaults.ACCURACY_DROP,
+                        help='Accuracy loss (percentage points) that forces a full retrain')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='float32 feature frames without intermediate copies')
+    parser.add_argument('--pooled', action='store_true',
+                        help='Train one multi-ticker model and compare it with per-ticker models')
+    parser.add_argument('--walk-forward', action='store_true',
+                        help='Expanding-window out-of-sample evaluation into model_stats (no training)')
+    parser.add_argument('--walk-forward-step', type=int, default=defaults.WALK_FORWARD_STEP,
+                        help='Bars scored per walk-forward window')
+    parser.add_argument('--market-features', action='store_true',
+                        help='Add rolling correlation/beta to ^BSESN and the market regime '
+                             'to the company models')
+    _add_run_arguments(parser)
+
+
+def add_stats_arguments(parser):
+    parser.add_argument('--tickers', nargs='+', default=defaults.SENSEX_TICKERS,
+                        help='List of tickers')
+
+
+def add_bench_arguments(parser):
+    parser.add_argument('--tickers', type=int, default=34, help='Number of synthetic tickers')
+    parser.add_argument('--years', type=int, default=10, help='Years of daily bars per ticker')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (best is kept)')
+    parser.add_argument('--storage', action='store_true', help='Also compare sensex_data layouts')
+    parser.add_argument('--mongo-uri', default=None, help='Real MongoDB for the storage benchmark')
+    parser.add_argument('--train-tickers', type=int, default=3, help='Tickers timed through training')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Previous JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Slowdown ratio above which a timing counts as a regression')
+
+
+def _ingest(args):
+    load_script('fetch_latest_data', INGEST_SCRIPT).main(args)
+
+
+def _train(args):
+    load_script('train_update', TRAIN_SCRIPT).run(args)
+
+
+def _stats(args):
+    """Rebuild model_stats and the dashboard snapshots from the cached prices, without training"""
+    from volatisense.market import load_market, write_market_snapshot
+    from volatisense.price_store import PriceStore
+    from volatisense.snapshots import SNAPSHOT_COLLECTION, refresh_summary, write_ticker_snapshot
+    from volatisense.stats import build_model_stats
+    from volatisense.storage import get_collection
+
+    store = PriceStore()
+    collection = get_collection("model_stats")
+    snapshots = get_collection(SNAPSHOT_COLLECTION)
+    updated = 0
+    for ticker in args.tickers:
+        data = store.cached(ticker)
+        # Accuracy (and any walk-forward backtest) belong to the model, so they are kept
+        stored = collection.find_one({"ticker": ticker}, {"_id": 0, "accuracy": 1, "backtest": 1})
+        if data.empty or stored is None:
+            print(f"[WARNING] Skipping {ticker}: "
+                  f"{'no cached prices' if data.empty else 'no model_stats yet, train it first'}")
+            continue
+        model_stats = build_model_stats(ticker, data, stored.get('accuracy', 0.0))
+        if stored.get('backtest'):
+            model_stats['backtest'] = stored['backtest']
+        collection.update_one({"ticker": ticker}, {"$set": model_stats}, upsert=True)
+        write_ticker_snapshot(snapshots, model_stats)
+        updated += 1
+    refresh_summary(snapshots)
+    print(f"[INFO] Refreshed model_stats for {updated} of {len(args.tickers)} tickers")
+
+    features, moments = load_market(store)
+    if features is None:
+        print("[WARNING] ^BSESN is not cached, no market correlation snapshot")
+    elif write_market_snapshot(snapshots, features, moments):
+        print("[INFO] Updated the market correlation snapshot")
+
+
+def _bench(args):
+    from volatisense import bench
+    bench.run(args)
+
+
+COMMANDS = {
+    'ingest': (add_ingest_arguments, _ingest, 'Fetch prices, compute indicators and labels, write sensex_data'),
+    'train': (add_train_arguments, _train, 'Train, update or evaluate the per-ticker risk models'),
+    'stats': (add_stats_arguments, _stats, 'Refresh model_stats, dashboard and market snapshots from cached prices'),
+    'bench': (add_bench_arguments, _bench, 'Offline benchmarks on synthetic prices'),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='volatisense')
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (add_arguments, handler, summary) in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=summary, description=summary)
+        add_arguments(sub)
+        sub.set_defaults(handler=handler)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
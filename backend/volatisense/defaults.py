@@ -0,0 +1,27 @@
+"""Defaults shared by the pipeline scripts and the ``volatisense`` CLI.
+
+Standard library only, so the CLI can build its parsers and print ``--help``
+without importing NumPy, pandas or XGBoost.
+"""
+
+# Companies with a per-ticker model; the ingest also stores the index itself
+SENSEX_TICKERS = [
+    "RELIANCE.NS", "NIITLTD.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "HINDUNILVR.NS", "BHARTIARTL.NS",
+    "KOTAKBANK.NS", "ITC.NS", "AXISBANK.NS", "MARUTI.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS",
+    "HCLTECH.NS", "LUPIN.NS", "ULTRACEMCO.NS", "NTPC.NS", "WIPRO.NS", "M&M.NS", "POWERGRID.NS",
+    "SBIN.NS", "ASIANPAINT.NS", "DRREDDY.NS", "BAJAJ-AUTO.NS", "SUNPHARMA.NS", "JSWSTEEL.NS",
+    "TATAMOTORS.NS", "TITAN.NS", "HDFCLIFE.NS", "INDUSINDBK.NS", "DIVISLAB.NS", "AAPL", "SMSN.IL",
+]
+INDEX_TICKER = "^BSESN"
+
+# Risk-label thresholds
+THRESHOLD_MODES = ('full', 'rolling', 'expanding')
+LABEL_WINDOW = 250        # Bars for rolling thresholds
+
+# Incremental (warm-start) updates
+UPDATE_ROUNDS = 10        # Trees added to a company model per nightly update
+DRIFT_THRESHOLD = 0.25    # PSI of returns since the last full retrain vs before it
+ACCURACY_DROP = 10.0      # Allowed fall in out-of-sample accuracy, percentage points
+
+# Walk-forward evaluation
+WALK_FORWARD_STEP = 250   # Bars scored per window before the model is refit
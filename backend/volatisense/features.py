@@ -0,0 +1,359 @@
+"""Vectorized feature kernel shared by the ingest and training scripts.
+
+All indicators are computed in one pass over contiguous float64 NumPy
+arrays; shared building blocks (returns, moving windows, EMAs) are computed
+once and reused. Two feature sets are exposed:
+
+- ``ingest``: the columns written to ``sensex_data`` by
+  ``fetch_latest_data.compute_technical_indicators``
+- ``training``: the model inputs built by ``train_update.engineer_features``
+
+Each set reproduces its original pandas/ta definition, so switching a script
+to this kernel does not change stored data or model inputs.
+"""
+import bisect
+from array import array
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURE_SETS = {
+    'ingest': ['Return', 'MA_5', 'MA_10', 'MA_50', 'MA_200', 'STD_5', 'Range', 'Range_Ratio',
+               'Price_to_MA5', 'Price_to_MA10', 'Momentum', 'Volume_Change', 'VaR_95',
+               'VaR_99', 'VaR_90', 'Volatility', 'RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower', 'ATR'],
+    'training': ['Return', 'Volatility', 'SMA_5', 'SMA_10', 'EMA_5', 'EMA_10',
+                 'MACD', 'MACD_Signal', 'RSI'],
+}
+
+
+# Array primitives
+def as_array(values):
+    """Contiguous float64 view of a Series/array (no copy when already float64)"""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def pct_change(x):
+    out = np.full_like(x, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(x[1:], x[:-1], out=out[1:])
+    out[1:] -= 1.0
+    return out
+
+
+def shift(x, periods):
+    out = np.full_like(x, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+
+def rolling_mean(x, window):
+    """Same as ``Series.rolling(window).mean()``; NaN anywhere in the window gives NaN"""
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def rolling_std(x, window, block=512):
+    """Same as ``Series.rolling(window).std()`` (ddof=1)"""
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        view = sliding_window_view(x, window)
+        # std materializes a (rows x window) deviation array; blocks keep it small
+        for start in range(0, len(view), block):
+            out[window - 1 + start:window - 1 + start + block] = \
+                view[start:start + block].std(axis=1, ddof=1)
+    return out
+
+
+def rolling_quantiles(x, window, qs):
+    """Rolling quantiles for several levels in a single pass.
+
+    Equivalent to calling ``Series.rolling(window).quantile(q)`` (linear
+    interpolation) once per level, but the window is kept as one sorted list:
+    each bar is placed by bisection and the bar leaving the window is removed
+    the same way, so every level is read off the same order statistics.
+    Returns an array of shape ``(len(qs), len(x))``.
+    """
+    qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+    out = np.full((len(qs), len(x)), np.nan)
+    if len(x) < window:
+        return out
+    pos = qs * (window - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, window - 1)
+    levels = list(zip(lo.tolist(), hi.tolist(), (pos - lo).tolist()))
+
+    values = x.tolist()
+    ordered = []
+    n_nan = 0
+    insort, bisect_left = bisect.insort, bisect.bisect_left
+    # Flat typed buffers instead of a Python list per row
+    filled, rows = array('q'), array('d')
+    for i, v in enumerate(values):
+        if v != v:
+            n_nan += 1
+        else:
+            insort(ordered, v)
+        if i >= window:
+            old = values[i - window]
+            if old != old:
+                n_nan -= 1
+            else:
+                del ordered[bisect_left(ordered, old)]
+        # Like pandas, a window containing NaN has no quantile
+        if i >= window - 1 and not n_nan:
+            filled.append(i)
+            rows.extend([ordered[l] + (ordered[h] - ordered[l]) * f for l, h, f in levels])
+    if filled:
+        out[:, np.frombuffer(filled, dtype=np.int64)] = np.frombuffer(rows).reshape(-1, len(qs)).T
+    return out
+
+
+def expanding_quantiles(x, qs, min_periods=1):
+    """Quantiles of every non-NaN value up to each bar, like ``Series.expanding().quantile(q)``.
+
+    Same single sorted-list pass as rolling_quantiles, without evictions.
+    Returns an array of shape ``(len(qs), len(x))``.
+    """
+    qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+    out = np.full((len(qs), len(x)), np.nan)
+    ordered = []
+    insort = bisect.insort
+    filled, rows = array('q'), array('d')
+    for i, v in enumerate(as_array(x).tolist()):
+        if v == v:
+            insort(ordered, v)
+        n = len(ordered)
+        if n >= max(min_periods, 1):
+            filled.append(i)
+            for q in qs.tolist():
+                pos = q * (n - 1)
+                lo = int(pos)
+                hi = min(lo + 1, n - 1)
+                rows.append(ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo))
+    if filled:
+        out[:, np.frombuffer(filled, dtype=np.int64)] = np.frombuffer(rows).reshape(-1, len(qs)).T
+    return out
+
+
+def rolling_quantile(x, window, q):
+    """Same as ``Series.rolling(window).quantile(q)`` with linear interpolation"""
+    return rolling_quantiles(x, window, [q])[0]
+
+
+def _lfilter(b, a, x, zi):
+    # scipy.signal costs about a second to import; only the recursions need it
+    from scipy.signal import lfilter
+    return lfilter(b, a, x, zi=zi)
+
+
+def ema(x, span=None, alpha=None, min_periods=0):
+    """Same as ``Series.ewm(span/alpha, adjust=False, min_periods).mean()``.
+
+    The recursion runs in C through ``lfilter``. Leading NaNs are skipped, as
+    pandas does; the inputs here never contain NaNs after the first valid value.
+    """
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    out = np.full_like(x, np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0:
+        return out
+    first = valid[0]
+    tail = x[first:]
+    out[first:] = _lfilter([alpha], [1.0, alpha - 1.0], tail, [(1.0 - alpha) * tail[0]])[0]
+    if min_periods > 1:
+        out[first:first + min_periods - 1] = np.nan
+    return out
+
+
+def rsi_wilder(close, window=14):
+    """RSI as computed by ``ta.momentum.RSIIndicator``"""
+    diff = np.diff(close, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    avg_up = ema(up, alpha=1.0 / window, min_periods=window)
+    avg_down = ema(down, alpha=1.0 / window, min_periods=window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+
+
+def rsi_sma(close, window=14):
+    """RSI with simple moving averages (the training feature set)"""
+    diff = np.diff(close, prepend=np.nan)
+    gain = rolling_mean(np.where(diff > 0, diff, 0.0), window)
+    loss = rolling_mean(np.where(diff < 0, -diff, 0.0), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def atr(high, low, close, window=14):
+    """Average true range as computed by ``ta.volatility.AverageTrueRange``"""
+    prev_close = shift(close, 1)
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    out = np.zeros_like(close)
+    if len(close) < window:
+        out[:] = np.nan
+        return out
+    alpha = 1.0 / window
+    seed = true_range[:window].mean()
+    out[window - 1] = seed
+    if len(close) > window:
+        out[window:] = _lfilter([alpha], [1.0, alpha - 1.0], true_range[window:],
+                                [(1.0 - alpha) * seed])[0]
+    return out
+
+
+def _ratio_minus_one(num, den):
+    # np.where(den != 0, num / den - 1, 0) without the divide warnings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / den - 1.0, 0.0)
+
+
+# Kernel
+def _iter_features(high, low, close, volume=None, feature_set='ingest'):
+    """Yield (name, float64 array) per feature in column order.
+
+    Intermediates are dropped as soon as their last consumer has run, so
+    callers that store each column as it arrives hold only a few full-length
+    float64 arrays at a time.
+    """
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    ret = pct_change(close)
+
+    if feature_set == 'training':
+        yield 'Return', ret
+        yield 'Volatility', rolling_std(ret, 5)
+        yield 'SMA_5', rolling_mean(close, 5)
+        yield 'SMA_10', rolling_mean(close, 10)
+        yield 'EMA_5', ema(close, span=5)
+        yield 'EMA_10', ema(close, span=10)
+        macd = ema(close, span=12) - ema(close, span=26)
+        yield 'MACD', macd
+        yield 'MACD_Signal', ema(macd, span=9)
+        del macd
+        yield 'RSI', rsi_sma(close, 14)
+        return
+
+    if feature_set != 'ingest':
+        raise ValueError(f"Unknown feature set: {feature_set}")
+
+    yield 'Return', ret
+    ma5, ma10 = rolling_mean(close, 5), rolling_mean(close, 10)
+    yield 'MA_5', ma5
+    yield 'MA_10', ma10
+    yield 'MA_50', rolling_mean(close, 50)
+    yield 'MA_200', rolling_mean(close, 200)
+    yield 'STD_5', rolling_std(close, 5)
+    rng = high - low
+    yield 'Range', rng
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yield 'Range_Ratio', np.where(close != 0, rng / close, 0.0)
+    del rng
+    yield 'Price_to_MA5', _ratio_minus_one(close, ma5)
+    yield 'Price_to_MA10', _ratio_minus_one(close, ma10)
+    del ma5, ma10
+    yield 'Momentum', close - shift(close, 5)
+
+    if volume is not None:
+        volume = as_array(volume)
+    if volume is None or np.isnan(volume).all():
+        yield 'Volume_Change', np.zeros_like(close)
+    else:
+        yield 'Volume_Change', pct_change(volume)
+
+    # VaR at 99/95/90% (the risk-label thresholds) from one pass over the window
+    if len(close) >= 100:
+        var_99, var_95, var_90 = rolling_quantiles(ret, 100, [0.01, 0.05, 0.10])
+    else:
+        worst = np.nanmin(ret) if len(close) > 1 else np.nan
+        var_99, var_95, var_90 = (np.full_like(close, worst) for _ in range(3))
+    yield 'VaR_95', var_95
+    yield 'VaR_99', var_99
+    yield 'VaR_90', var_90
+    del var_99, var_95, var_90
+
+    yield 'Volatility', rolling_std(ret, 20)
+    yield 'RSI', rsi_wilder(close, 14)
+    # ta's MACD only reports values once each EMA has a full window
+    macd = ema(close, span=12, min_periods=12) - ema(close, span=26, min_periods=26)
+    yield 'MACD', macd
+    yield 'MACD_Signal', ema(macd, span=9, min_periods=9)
+    del macd
+    ma20, std20 = rolling_mean(close, 20), rolling_std(close, 20)
+    yield 'BB_Upper', ma20 + 2 * std20
+    yield 'BB_Lower', ma20 - 2 * std20
+    del ma20, std20
+    yield 'ATR', atr(high, low, close, 14)
+
+
+def compute_features(high, low, close, volume=None, feature_set='ingest'):
+    """Compute a feature set from OHLCV arrays.
+
+    Returns a dict mapping column name -> float64 array, in the set's column
+    order. ``volume`` may be None when the source has no volume data.
+    """
+    features = dict(_iter_features(high, low, close, volume, feature_set))
+    if feature_set == 'ingest':
+        # Infinities (zero prices/volumes) are treated as missing, in place
+        for values in features.values():
+            values[np.isinf(values)] = np.nan
+    return features
+
+
+def feature_matrix(high, low, close, volume=None, feature_set='ingest', dtype=np.float32, out=None):
+    """Write a feature set into one preallocated column-major matrix.
+
+    Each float64 column is cast into ``out`` (shape ``(n, len(columns))``)
+    as soon as it is computed. Returns ``(out, columns)``.
+    """
+    columns = FEATURE_SETS[feature_set]
+    if out is None:
+        out = np.empty((len(as_array(close)), len(columns)), dtype=dtype, order='F')
+    position = {name: i for i, name in enumerate(columns)}
+    for name, values in _iter_features(high, low, close, volume, feature_set):
+        column = out[:, position[name]]
+        column[...] = values
+        if feature_set == 'ingest':
+            column[np.isinf(column)] = np.nan
+    return out, columns
+
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def lean_frame(df, feature_set='ingest', dtype=np.float32):
+    """OHLCV plus features with the features as one float32 block, warm-up rows dropped.
+
+    Features are cast into one preallocated matrix as they are computed, so
+    there are no per-column float64 feature arrays. Raw OHLCV columns keep
+    their source dtype: they are stored as-is, and float32 would round
+    volumes above 2**24 and the paise of prices. Rows with NaNs are removed
+    by slicing when they only precede the first complete row (the usual
+    warm-up), and by a mask otherwise. The caller can release ``df``
+    afterwards.
+    """
+    # Raw columns keep the source order so feature lists match the float64 path
+    raw = df[[c for c in df.columns if c in OHLCV_COLUMNS]]
+    columns = FEATURE_SETS[feature_set]
+    matrix = np.empty((len(df), len(columns)), dtype=dtype, order='F')
+    volume = df['Volume'] if 'Volume' in df.columns else None
+    feature_matrix(df['High'], df['Low'], df['Close'], volume, feature_set, out=matrix)
+
+    complete = ~(np.isnan(matrix).any(axis=1) | raw.isna().any(axis=1).to_numpy())
+    first = int(np.argmax(complete)) if complete.any() else len(complete)
+    rows = slice(first, None) if complete[first:].all() else complete
+    # The transposed F-ordered matrix is C-contiguous, so pandas wraps it without copying
+    features = pd.DataFrame(matrix[rows], index=df.index[rows], columns=columns, copy=False)
+    return pd.concat([raw.iloc[rows], features], axis=1)
+
+
+def feature_frame(df, feature_set='ingest'):
+    """Run the kernel on an OHLCV DataFrame and return the features as a DataFrame"""
+    volume = df['Volume'] if 'Volume' in df.columns else None
+    features = compute_features(df['High'], df['Low'], df['Close'], volume, feature_set)
+    return pd.DataFrame(features, index=df.index, copy=False)
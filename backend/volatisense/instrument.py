@@ -0,0 +1,230 @@
+"""Stage timers, run reports and an opt-in profiler for the pipeline scripts.
+
+Per-ticker work runs inside ``track(ticker)``; code below it wraps its steps
+in ``stage(name)`` and reports sizes with ``count_rows(name, n)``. Both are
+no-ops outside a tracked ticker, so the script functions stay usable on
+their own. The recorder is thread-local and its ``result()`` is a plain dict,
+so timings measured in pool workers travel back with the task result;
+``attach(recorder)`` carries one ticker's recorder across pipeline threads.
+
+``RunReport`` collects those results and, on ``finish()``, appends one JSON
+line per ticker plus one for the run to a log file and stores the run in
+the ``pipeline_runs`` collection.
+"""
+import cProfile
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_LOG = os.environ.get(
+    'VOLATISENSE_RUN_LOG',
+    os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'logs', 'pipeline_runs.jsonl'))
+)
+RUNS_COLLECTION = "pipeline_runs"
+
+_local = threading.local()
+
+
+def peak_rss_mb(children=False):
+    """High-water resident set size of this process (or its finished children) in MB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class TickerRecorder:
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.stages = {}
+        self.rows = {}
+        self.error = None
+        self.started = time.perf_counter()
+
+    def result(self):
+        return {
+            "ticker": self.ticker,
+            "status": "error" if self.error else "ok",
+            "seconds": time.perf_counter() - self.started,
+            "stages": dict(self.stages),
+            "rows": dict(self.rows),
+            "peak_rss_mb": peak_rss_mb(),
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def attach(recorder):
+    """Make an existing recorder current on this thread, e.g. in a later pipeline stage"""
+    previous = current()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def track(ticker):
+    """Record stages and row counts for ticker on this thread"""
+    return attach(TickerRecorder(ticker))
+
+
+@contextmanager
+def stage(name):
+    """Add the wall time of the block to the current ticker's ``name`` stage"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder = current()
+        if recorder is not None:
+            recorder.stages[name] = recorder.stages.get(name, 0.0) + time.perf_counter() - t0
+
+
+def count_rows(name, n):
+    recorder = current()
+    if recorder is not None:
+        recorder.rows[name] = int(n)
+
+
+def fail(error):
+    """Mark the current ticker as failed where the error is handled rather than raised"""
+    recorder = current()
+    if recorder is not None:
+        recorder.error = str(error)
+
+
+class RunReport:
+    """Timings for one pipeline run, emitted as JSON lines and a pipeline_runs document"""
+
+    def __init__(self, pipeline, params=None, path=RUN_LOG):
+        self.run_id = uuid.uuid4().hex
+        self.pipeline = pipeline
+        self.params = params or {}
+        self.path = path
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tickers = []
+        self.throughput = {}  # Per-stage pipeline stats, when the run was pipelined
+
+    @contextmanager
+    def stage(self, name):
+        """Time a run-level step (e.g. the bulk prefetch) that is not per ticker"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def add(self, result):
+        self.tickers.append(result)
+
+    def summary(self, status=None):
+        stages = dict(self.stages)
+        rows = {}
+        for result in self.tickers:
+            for name, seconds in result.get('stages', {}).items():
+                stages[name] = stages.get(name, 0.0) + seconds
+            for name, n in result.get('rows', {}).items():
+                rows[name] = rows.get(name, 0) + n
+        failed = [r['ticker'] for r in self.tickers if r.get('status') != 'ok']
+        return {
+            "type": "run",
+            "run_id": self.run_id,
+            "pipeline": self.pipeline,
+            "status": status or ("partial" if failed else "ok"),
+            "started_at": self.started_at.isoformat(timespec='seconds'),
+            "finished_at": datetime.now().isoformat(timespec='seconds'),
+            "seconds": time.perf_counter() - self.started,
+            "tickers": len(self.tickers),
+            "failed": failed,
+            "stages": stages,
+            "rows": rows,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb(children=True),
+            "params": self.params,
+            **({"throughput": self.throughput} if self.throughput else {}),
+        }
+
+    def finish(self, status=None, collection=None):
+        """Write the report; failures to write are logged, never raised"""
+        summary = self.summary(status)
+        lines = [{"type": "ticker", "run_id": self.run_id, "pipeline": self.pipeline, **r}
+                 for r in self.tickers] + [summary]
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a') as f:
+                    for line in lines:
+                        f.write(json.dumps(line, default=str) + '\n')
+            except OSError as e:
+                print(f"[WARNING] Could not write run report to {self.path}: {e}")
+
+        try:
+            if collection is None:
+                from volatisense.storage import get_collection
+                collection = get_collection(RUNS_COLLECTION)
+            collection.insert_one({**summary, "ticker_results": self.tickers})
+        except Exception as e:
+            print(f"[WARNING] Could not store run report in {RUNS_COLLECTION}: {e}")
+
+        stages = ", ".join(f"{k} {v:.1f}s" for k, v in sorted(summary['stages'].items(),
+                                                                key=lambda kv: -kv[1]))
+        print(f"[INFO] Run {self.run_id[:8]} {summary['status']} in {summary['seconds']:.1f}s "
+              f"(peak RSS {summary['peak_rss_mb'] or 0:.0f} MB): {stages}")
+        return summary
+
+
+@contextmanager
+def profiled(path):
+    """Profile the block into path; no-op when path is None.
+
+    ``*.svg`` records a flame graph with py-spy (including worker processes)
+    when it is installed; anything else is a cProfile dump for pstats/snakeviz.
+    """
+    if not path:
+        yield
+        return
+
+    if path.endswith('.svg') and shutil.which('py-spy'):
+        spy = subprocess.Popen(['py-spy', 'record', '--pid', str(os.getpid()), '--subprocesses',
+                                '--output', path, '--format', 'flamegraph'])
+        try:
+            yield
+        finally:
+            # py-spy writes the flame graph when interrupted
+            spy.send_signal(signal.SIGINT)
+            spy.wait()
+            print(f"[INFO] py-spy flame graph written to {path}")
+        return
+
+    if path.endswith('.svg'):
+        path = path[:-len('.svg')] + '.prof'
+        print(f"[WARNING] py-spy not found, writing a cProfile dump to {path} instead")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"[INFO] cProfile stats written to {path}")
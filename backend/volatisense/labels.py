@@ -0,0 +1,60 @@
+"""Risk labels from return quantiles, shared by the ingest and training scripts.
+
+A bar is High risk (2) when its return is below the 5% quantile, Medium (1)
+below the 10% quantile and Low (0) otherwise. Thresholds come from:
+
+- ``'full'``: the whole series, one ``np.quantile`` call (the historical
+  behaviour; every bar's label can change when history is appended)
+- ``'rolling'``: the trailing ``window`` bars, current bar included
+- ``'expanding'``: every bar so far, current bar included
+
+Rolling and expanding labels depend only on bars up to their own, so
+appending history never relabels old bars and only the new bars' codes need
+to be computed. Bars without a threshold yet, or without a return, get -1.
+"""
+import numpy as np
+import pandas as pd
+
+from volatisense.features import as_array, expanding_quantiles, rolling_quantiles
+
+RISK_LABELS = ['Low', 'Medium', 'High']
+RISK_LEVELS = (0.05, 0.10)
+
+
+def risk_thresholds(returns, mode='full', window=None, min_periods=None, levels=RISK_LEVELS):
+    """(High, Medium) cut-offs: shape (2,) for 'full', (2, n) per bar otherwise"""
+    returns = as_array(returns)
+    if mode == 'full':
+        valid = returns[~np.isnan(returns)]
+        if not len(valid):
+            return np.full(len(levels), np.nan)
+        return np.quantile(valid, levels)
+    if mode == 'rolling':
+        if not window:
+            raise ValueError("Rolling thresholds need a window")
+        return rolling_quantiles(returns, window, levels)
+    if mode == 'expanding':
+        return expanding_quantiles(returns, levels, min_periods or 1)
+    raise ValueError(f"Unknown threshold mode: {mode}")
+
+
+def risk_codes(returns, mode='full', window=None, min_periods=None):
+    """int8 risk codes (0=Low, 1=Medium, 2=High; -1 where undefined)"""
+    returns = as_array(returns)
+    thresholds = risk_thresholds(returns, mode, window, min_periods)
+    missing = np.isnan(returns)
+    if thresholds.ndim == 1:
+        # side='right': a return equal to a cut-off falls in the safer class
+        codes = 2 - np.searchsorted(thresholds, returns, side='right')
+        missing |= np.isnan(thresholds).any()
+    else:
+        codes = 2 - (returns >= thresholds[0]) - (returns >= thresholds[1])
+        missing |= np.isnan(thresholds).any(axis=0)
+    codes = codes.astype(np.int8)
+    codes[missing] = -1
+    return codes
+
+
+def risk_labels(codes):
+    """Categorical 'Low'/'Medium'/'High' labels for int8 codes (-1 becomes NaN)"""
+    return pd.Categorical.from_codes(codes, categories=RISK_LABELS)
@@ -0,0 +1,299 @@
+"""Cross-sectional market features: rolling correlation and beta to ^BSESN,
+mean peer correlation and a market volatility regime.
+
+All tickers' daily returns sit in one panel on the index's trading calendar.
+``RollingMoments`` keeps, for every pair of tickers, the co-observation
+count, the sums and the cross-products over the trailing window. Each new bar
+adds its outer products and takes away those of the bar leaving the window,
+so a full correlation matrix costs O(tickers²) per bar and not
+O(tickers² x window). Every ``window`` bars the sums are rebuilt from the
+buffered rows so rounding error cannot accumulate.
+
+Counts are per pair (pairwise-complete, like ``DataFrame.rolling().corr()``),
+so a ticker listed later than the others only lacks values until it has a
+window of its own history.
+
+- ``market_features``: per-bar, per-ticker ``MARKET_FEATURES``; the training
+  script joins them onto ``engineer_features`` with ``--market-features``
+- ``matrix_body``: the latest correlation matrix, betas and regime as a
+  compact document for the dashboard (snapshot key ``_market``)
+"""
+import numpy as np
+import pandas as pd
+
+from volatisense.defaults import INDEX_TICKER, SENSEX_TICKERS
+from volatisense.snapshots import MARKET_KEY, write_snapshot
+
+MARKET_FEATURES = ['Corr_Index', 'Beta_Index', 'Avg_Corr', 'Market_Vol_Ratio', 'Market_Regime']
+REGIMES = ['calm', 'normal', 'turbulent']
+
+CORR_WINDOW = 60        # Bars (about a quarter) behind each correlation and beta
+REGIME_SHORT = 20       # Bars of recent index volatility ...
+REGIME_LONG = 250       # ... compared with this many (needs at least CORR_WINDOW)
+REGIME_CUTS = (0.8, 1.25)  # Short/long volatility ratio below: calm, above: turbulent
+MATRIX_DIGITS = 3
+
+
+def _blocks(acc, n):
+    # (cross, sums, squares, count) views of accumulator array(s) of shape (..., 3n, 2n)
+    return acc[..., :n, :n], acc[..., :n, n:], acc[..., n:2 * n, n:], acc[..., 2 * n:, n:]
+
+
+def _centered(acc, n, min_periods):
+    """Co-moments and each side's variance (both times count - 1) over the shared bars"""
+    cross, sums, squares, count = _blocks(acc, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_i = sums / count
+        comoment = cross - mean_i * np.swapaxes(sums, -1, -2)
+        spread = squares - mean_i * sums
+    # A constant column (ffilled holiday prices) has no variance, only rounding noise
+    spread = np.where(spread > 1e-12 * squares, spread, np.nan)
+    short = count < max(min_periods, 2)
+    comoment[short] = np.nan
+    spread[short] = np.nan
+    return count, comoment, spread
+
+
+def relations(acc, n, k=None, min_periods=2):
+    """Correlation matrices and betas on column k (None to skip) from accumulator array(s)"""
+    _, comoment, spread = _centered(acc, n, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.clip(comoment / np.sqrt(spread * np.swapaxes(spread, -1, -2)), -1.0, 1.0)
+        beta = None if k is None else comoment[..., :, k] / spread[..., k, :]
+    return corr, beta
+
+
+def variances(acc, n, min_periods=2):
+    count, _, spread = _centered(acc, n, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.diagonal(spread, axis1=-2, axis2=-1) / np.diagonal(count - 1, axis1=-2, axis2=-1)
+
+
+class RollingMoments:
+    """Pairwise rolling moments of a stream of return vectors.
+
+    Each bar has a value (or NaN) per column. The four accumulators are
+    blocks of one ``(3n, 2n)`` array, so a bar is added (or removed) with a
+    single outer product:
+
+    - ``cross[i, j]``: sum of x_i * x_j
+    - ``sums[i, j]``: sum of x_i
+    - ``squares[i, j]``: sum of x_i ** 2
+    - ``count[i, j]``: number of bars
+
+    each over the bars in the window where both i and j had a value.
+    """
+
+    def __init__(self, n, window):
+        self.n = n
+        self.window = window
+        self.bars = 0
+        # Ring buffer of the rows in the window; NaN is stored as 0 with present=0
+        self._values = np.zeros((window, n))
+        self._present = np.zeros((window, n))
+        self._acc = np.zeros((3 * n, 2 * n))
+        self.cross, self.sums, self.squares, self.count = _blocks(self._acc, n)
+
+    @staticmethod
+    def _operands(values, present):
+        # Left: (x, x², present), right: (x, present); missing x are 0 so drop out
+        return (np.concatenate([values, values * values, present], axis=-1),
+                np.concatenate([values, present], axis=-1))
+
+    def update(self, x):
+        """Add one bar (and drop the one leaving the window)"""
+        self.extend(np.asarray(x, dtype=np.float64)[None, :])
+
+    def extend(self, rows):
+        """Add bars in order; returns the accumulators as they stood after each one.
+
+        The result has shape ``(len(rows), 3n, 2n)``, so feed long histories
+        in chunks of about ``window`` bars.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        states = []
+        start = 0
+        while start < len(rows):
+            # Stop at the end of the ring so each segment maps to contiguous slots
+            stop = start + min(len(rows) - start, self.window - self.bars % self.window)
+            states.append(self._extend_slots(rows[start:stop]))
+            start = stop
+        if len(states) == 1:
+            return states[0]
+        return np.concatenate(states) if states else np.empty((0,) + self._acc.shape)
+
+    def _extend_slots(self, rows):
+        present = ~np.isnan(rows)
+        values = np.where(present, rows, 0.0)
+        present = present.astype(np.float64)
+        first = self.bars % self.window
+        slots = slice(first, first + len(rows))
+
+        # Per-bar outer products, minus those of the bars leaving the window,
+        # summed in bar order on top of the running accumulators
+        left, right = self._operands(values, present)
+        if self.bars >= self.window:
+            # Entering minus leaving bar as one (3n x 2) @ (2 x 2n) product per bar
+            old_left, old_right = self._operands(self._values[slots], self._present[slots])
+            left = np.stack([left, -old_left], axis=2)
+            right = np.stack([right, old_right], axis=1)
+        else:
+            left, right = left[:, :, None], right[:, None, :]
+        states = left @ right
+        states[0] += self._acc
+        for t in range(1, len(states)):
+            states[t] += states[t - 1]
+
+        self._values[slots] = values
+        self._present[slots] = present
+        self.bars += len(rows)
+        self._acc[:] = states[-1]
+        if self.bars % self.window == 0:
+            self.resync()
+            states[-1] = self._acc
+        return states
+
+    def resync(self):
+        """Rebuild the accumulators from the buffered rows (drops rounding drift)"""
+        rows = min(self.bars, self.window)
+        left, right = self._operands(self._values[:rows], self._present[:rows])
+        self._acc[:] = left.T @ right
+
+    def covariance(self, min_periods=None):
+        count, comoment, _ = _centered(self._acc, self.n, min_periods or self.window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return comoment / (count - 1)
+
+    def variance(self, min_periods=None):
+        return variances(self._acc, self.n, min_periods or self.window)
+
+    def correlation(self, min_periods=None):
+        return relations(self._acc, self.n, None, min_periods or self.window)[0]
+
+    def beta(self, k, min_periods=None):
+        """Slope of each column's returns on column k's, over the bars both have"""
+        return relations(self._acc, self.n, k, min_periods or self.window)[1]
+
+
+def market_returns(store, tickers=None, index=INDEX_TICKER):
+    """Daily returns of the cached tickers on the index's trading days, index first.
+
+    Closes are carried forward over days a ticker's own exchange was shut, so
+    foreign listings get a 0% return there. Tickers without a cache are left
+    out; returns before a ticker's first cached bar or after its last are NaN.
+    """
+    tickers = SENSEX_TICKERS if tickers is None else tickers
+    bars = store.cached(index)
+    if bars.empty:
+        return pd.DataFrame()
+    calendar = bars.index
+    closes = {index: bars['Close']}
+    for ticker in tickers:
+        if ticker == index or ticker in closes:
+            continue
+        bars = store.cached(ticker)
+        if not bars.empty:
+            close = bars['Close'].reindex(calendar.union(bars.index)).ffill().reindex(calendar)
+            # A stale cache must not read as flat prices up to the index's last bar
+            closes[ticker] = close.where(calendar <= bars.index[-1])
+    prices = pd.DataFrame(closes)
+    return prices.pct_change(fill_method=None).iloc[1:]
+
+
+def market_features(returns, index=INDEX_TICKER, window=CORR_WINDOW):
+    """Per-bar market features for every ticker in a ``market_returns`` panel.
+
+    Returns ``(features, moments)``: a float32 frame with (ticker, feature)
+    columns, where feature is one of ``MARKET_FEATURES`` and each bar uses
+    only bars up to its own, and the ``RollingMoments`` left at the last bar.
+    """
+    tickers = list(returns.columns)
+    k = tickers.index(index)
+    values = returns.to_numpy(dtype=np.float64)
+    n_bars, n = values.shape
+
+    moments = RollingMoments(n, window)
+    # Mean correlation with the other constituents, leaving out self and the index
+    peers = np.ones((n, n)) - np.eye(n)
+    peers[:, k] = 0.0
+
+    out = np.empty((n_bars, n, 3))
+    for start in range(0, n_bars, window):
+        states = moments.extend(values[start:start + window])
+        corr, beta = relations(states, n, k, window)
+        rows = slice(start, start + len(states))
+        out[rows, :, 0] = corr[:, :, k]
+        out[rows, :, 1] = beta
+        valid = ~np.isnan(corr)
+        with np.errstate(invalid='ignore'):
+            out[rows, :, 2] = (np.where(valid, corr, 0.0) * peers).sum(axis=2) / (valid * peers).sum(axis=2)
+
+    # Index volatility over the last REGIME_SHORT bars against the last REGIME_LONG
+    index_returns = values[:, k:k + 1]
+    short = variances(RollingMoments(1, REGIME_SHORT).extend(index_returns), 1, REGIME_SHORT)[:, 0]
+    long = variances(RollingMoments(1, REGIME_LONG).extend(index_returns), 1, window)[:, 0]
+    with np.errstate(invalid='ignore'):
+        ratio = np.sqrt(short / long)
+
+    regime = np.where(np.isnan(ratio), np.nan, np.searchsorted(REGIME_CUTS, ratio, side='right'))
+    block = np.concatenate([out, np.broadcast_to(np.stack([ratio, regime], axis=1)[:, None, :],
+                                                 (n_bars, n, 2))], axis=2)
+    columns = pd.MultiIndex.from_product([tickers, MARKET_FEATURES])
+    features = pd.DataFrame(block.reshape(n_bars, -1).astype(np.float32), index=returns.index,
+                            columns=columns)
+    return features, moments
+
+
+def ticker_features(features, ticker):
+    """One ticker's ``MARKET_FEATURES`` columns, or None when it is not in the panel"""
+    if features is None or ticker not in features.columns.get_level_values(0):
+        return None
+    return features[ticker]
+
+
+def join_market(data, market):
+    """Add market features to a per-ticker frame, taking the last index bar at or before each date"""
+    return data.join(market.reindex(data.index, method='ffill')).dropna()
+
+
+def _rounded(values, digits=MATRIX_DIGITS):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def matrix_body(features, moments, index=INDEX_TICKER):
+    """Latest correlation matrix, betas and regime for the dashboard.
+
+    ``corr`` is the upper triangle without the diagonal, row by row, in
+    ``tickers`` order: the pair (i, j) with i < j sits at
+    ``i * (2n - i - 1) / 2 + j - i - 1``.
+    """
+    tickers = list(features.columns.get_level_values(0).unique())
+    latest = features.iloc[-1]
+    upper = np.triu_indices(len(tickers), k=1)
+    ratio = float(latest[(index, 'Market_Vol_Ratio')])
+    regime = latest[(index, 'Market_Regime')]
+    return {
+        "asOf": features.index[-1].strftime('%Y-%m-%d'),
+        "index": index,
+        "window": moments.window,
+        "tickers": tickers,
+        "corr": _rounded(moments.correlation()[upper]),
+        "corrIndex": _rounded(latest.xs('Corr_Index', level=1).to_numpy()),
+        "beta": _rounded(latest.xs('Beta_Index', level=1).to_numpy()),
+        "avgCorr": _rounded(latest.xs('Avg_Corr', level=1).to_numpy()),
+        "volRatio": None if np.isnan(ratio) else round(ratio, MATRIX_DIGITS),
+        "regime": None if np.isnan(regime) else REGIMES[int(regime)],
+    }
+
+
+def load_market(store, tickers=None, index=INDEX_TICKER, window=CORR_WINDOW):
+    """``market_features`` over the price cache; ``(None, None)`` when the index is not cached"""
+    returns = market_returns(store, tickers, index)
+    if returns.empty:
+        return None, None
+    return market_features(returns, index, window)
+
+
+def write_market_snapshot(collection, features, moments):
+    """Store the matrix document under ``MARKET_KEY``; returns True if it changed"""
+    return write_snapshot(collection, MARKET_KEY, matrix_body(features, moments))
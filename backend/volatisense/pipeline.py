@@ -0,0 +1,142 @@
+"""Bounded producer-consumer pipeline for per-ticker work.
+
+Every stage runs ``workers`` threads that take items from a bounded input
+queue, call the stage function and put its result on the next stage's
+queue. A full queue blocks the stage feeding it, so a slow stage throttles
+everything upstream (backpressure) and at most ``queue_size + workers``
+items are waiting or in flight per stage. Threads fit this workload:
+downloads and Mongo writes wait on sockets, and the NumPy/pandas kernels
+release the GIL for most of their run time.
+"""
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: ``fn(item)`` returns the next item, or None to drop it"""
+
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.items = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_queued = 0
+        self.first = None
+        self.last = None
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def stats(self):
+        wall = self.last - self.first if self.first is not None else 0.0
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "busy_seconds": self.busy,
+            "wall_seconds": wall,
+            "items_per_second": self.items / wall if wall > 0 else None,
+            "utilization": self.busy / (wall * self.workers) if wall > 0 else None,
+            # Time spent waiting for room downstream; high values mean the next stage is the bottleneck
+            "blocked_seconds": self.blocked,
+            "max_queued": self.max_queued,
+        }
+
+
+class Pipeline:
+    """Runs items through stages connected by queues of at most ``queue_size`` items"""
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.seconds = 0.0
+
+    def _work(self, stage, inbox, outbox, consumers):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            t0 = time.perf_counter()
+            with stage._lock:
+                stage.max_queued = max(stage.max_queued, inbox.qsize() + 1)
+                if stage.first is None:
+                    stage.first = t0
+            try:
+                result = stage.fn(item)
+                failed = False
+            except Exception as e:
+                # Stage functions handle their own per-item errors; anything else drops the item
+                print(f"[ERROR] {stage.name} stage failed: {e}")
+                result, failed = None, True
+            t1 = time.perf_counter()
+            if result is not None:
+                outbox.put(result)
+            t2 = time.perf_counter()
+            with stage._lock:
+                stage.items += 1
+                stage.dropped += result is None
+                stage.errors += failed
+                stage.busy += t1 - t0
+                stage.blocked += t2 - t1
+                stage.last = t2
+
+        # The last worker of a stage tells every consumer of the next queue to stop
+        with stage._lock:
+            stage._running -= 1
+            last = stage._running == 0
+        if last:
+            for _ in range(consumers):
+                outbox.put(_DONE)
+
+    def run(self, items):
+        """Feed items through every stage; returns the last stage's results in completion order"""
+        t0 = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+        for i, stage in enumerate(self.stages):
+            consumers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            stage._running = stage.workers
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, name=f"{stage.name}-{n}",
+                                                args=(stage, queues[i], queues[i + 1], consumers),
+                                                daemon=True))
+
+        def feed():
+            for item in items:
+                queues[0].put(item)
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+
+        threads.append(threading.Thread(target=feed, name='pipeline-feed', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        results = []
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            results.append(item)
+        for thread in threads:
+            thread.join()
+        self.seconds = time.perf_counter() - t0
+        return results
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def log(self):
+        for stage in self.stages:
+            s = stage.stats()
+            rate = f"{s['items_per_second']:.2f}/s" if s['items_per_second'] else "-"
+            busy = f"{s['utilization'] * 100:.0f}%" if s['utilization'] is not None else "-"
+            print(f"[INFO] {stage.name}: {s['items']} items in {s['wall_seconds']:.1f}s ({rate}, "
+                  f"{s['workers']} workers {busy} busy, blocked {s['blocked_seconds']:.1f}s, "
+                  f"max queued {s['max_queued']})")
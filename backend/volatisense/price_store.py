@@ -0,0 +1,169 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Cached price histories live next to the ingest script unless overridden
+DEFAULT_CACHE_DIR = os.environ.get(
+    'VOLATISENSE_CACHE_DIR',
+    os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'dataset', 'cache'))
+)
+
+
+def yf_downloader(ticker, start, end):
+    """Download raw OHLCV bars for one ticker from Yahoo Finance"""
+    import yfinance as yf  # ~0.8 s to import; cached reads never need it
+    data = yf.download(ticker, start=start, end=end, auto_adjust=False,
+                       progress=False, threads=False)
+    # Handle multi-index columns if present
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    return data
+
+
+class PriceStore:
+    """On-disk OHLCV store with one columnar file per ticker.
+
+    Each ticker keeps a Parquet file with its bars and a small JSON sidecar
+    recording the date range that has already been downloaded. Requests for
+    a window inside that range are served from disk; anything outside it is
+    fetched through ``downloader`` (only the missing head/tail) and merged in.
+
+    ``downloader`` is any callable ``(ticker, start, end) -> DataFrame`` with
+    a DatetimeIndex, so a local stand-in can replace Yahoo Finance in tests.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, downloader=yf_downloader):
+        self.cache_dir = cache_dir
+        self.downloader = downloader
+
+    def _path(self, ticker, ext):
+        safe = ticker.replace(os.sep, '_')
+        return os.path.join(self.cache_dir, f"{safe}.{ext}")
+
+    def _read(self, ticker):
+        meta_path = self._path(ticker, 'json')
+        data_path = self._path(ticker, 'parquet')
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return None, None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        frame = pd.read_parquet(data_path)
+        coverage = (pd.Timestamp(meta['start']), pd.Timestamp(meta['end']))
+        return frame, coverage
+
+    def _write(self, ticker, frame, coverage):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path = self._path(ticker, 'parquet')
+        meta_path = self._path(ticker, 'json')
+        # Write to temp files first so a crash never leaves a half-written cache
+        frame.to_parquet(data_path + '.tmp')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({
+                'ticker': ticker,
+                'start': coverage[0].strftime('%Y-%m-%d'),
+                'end': coverage[1].strftime('%Y-%m-%d'),
+                'rows': int(len(frame)),
+            }, f)
+        os.replace(data_path + '.tmp', data_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _download(self, ticker, start, end):
+        data = self.downloader(ticker, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        if data is None or data.empty:
+            return pd.DataFrame()
+        data = data.copy()
+        data.index = pd.DatetimeIndex(data.index).tz_localize(None)
+        return data
+
+    def cached(self, ticker):
+        """Return everything cached for ticker without touching the network"""
+        frame, _ = self._read(ticker)
+        return frame if frame is not None else pd.DataFrame()
+
+    def mtime(self, ticker):
+        """Modification time of the ticker's cache file, or None if not cached"""
+        path = self._path(ticker, 'parquet')
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def coverage(self, ticker):
+        """Return the (start, end) range already cached for ticker, or None"""
+        meta_path = self._path(ticker, 'json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def get(self, ticker, start, end):
+        """Return bars for ticker in [start, end), downloading only what is missing"""
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
+        # Nothing after today can exist yet, so never mark it as covered
+        covered_end = min(end, pd.Timestamp.today().normalize() + pd.Timedelta(days=1))
+
+        cached, coverage = self._read(ticker)
+        if cached is None:
+            frame = self._download(ticker, start, covered_end)
+            if frame.empty:
+                return frame
+            self._write(ticker, frame.sort_index(), (start, covered_end))
+        else:
+            cov_start, cov_end = coverage
+            parts = [cached]
+            if start < cov_start:
+                parts.insert(0, self._download(ticker, start, cov_start))
+                cov_start = start
+            if covered_end > cov_end:
+                # Re-fetch the last cached bar too: it may have been written intraday
+                delta_start = min(cached.index[-1], cov_end) if not cached.empty else cov_end
+                parts.append(self._download(ticker, delta_start, covered_end))
+                cov_end = covered_end
+
+            if len(parts) > 1:
+                frame = pd.concat([p for p in parts if not p.empty] or [cached])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                self._write(ticker, frame, (cov_start, cov_end))
+            else:
+                frame = cached
+
+        return frame.loc[(frame.index >= start) & (frame.index < end)]
+
+    def get_many(self, tickers, start, end, max_workers=8, max_attempts=3, delay=2):
+        """Fetch many tickers through a bounded thread pool.
+
+        Every ticker is attempted once per round; only the ones that failed or
+        came back empty are retried in the next round, after an exponential
+        backoff, so a slow or broken ticker never stalls the rest.
+        Returns ``(frames, failed)`` where frames maps ticker -> DataFrame.
+        """
+        frames = {}
+        pending = list(dict.fromkeys(tickers))
+
+        def fetch(ticker):
+            try:
+                return ticker, self.get(ticker, start, end), None
+            except Exception as e:
+                return ticker, None, e
+
+        for attempt in range(max_attempts):
+            if not pending:
+                break
+            if attempt > 0:
+                time.sleep(delay * 2 ** (attempt - 1))  # Back off before retrying
+            failed = []
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+                for ticker, data, error in pool.map(fetch, pending):
+                    if error is not None:
+                        print(f"[ERROR] Failed to fetch {ticker} on attempt {attempt + 1}: {error}")
+                        failed.append(ticker)
+                    elif data.empty:
+                        print(f"[WARNING] Empty data retrieved for {ticker}, retrying ({attempt + 1}/{max_attempts})")
+                        failed.append(ticker)
+                    else:
+                        frames[ticker] = data
+            pending = failed
+
+        return frames, pending
@@ -0,0 +1,231 @@
+"""Model artifact registry.
+
+Each model directory holds:
+
+- ``model.ubj``: the XGBoost booster in its native UBJSON format
+- ``scaler.npz``: the StandardScaler's fitted arrays (absent for tree-only models)
+- ``manifest.json``: version, training date, feature list, metrics
+
+``ModelRegistry.load(ticker)`` serves artifacts from a size-bounded LRU
+cache and reloads an entry when its manifest's mtime changes. Directories
+that still hold only the old ``model.pkl``/``scaler.pkl`` pickles load as
+well; once a manifest exists it takes precedence over them.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+MODELS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'model', 'models'))
+BASELINE_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'model', 'baseline'))
+POOLED_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'model', 'pooled'))
+
+MODEL_FILE = 'model.ubj'
+SCALER_FILE = 'scaler.npz'
+MANIFEST_FILE = 'manifest.json'
+LEGACY_MODEL_FILES = ('model.pkl', 'baseline_model.pkl')
+LEGACY_SCALER_FILE = 'scaler.pkl'
+
+ModelArtifacts = namedtuple('ModelArtifacts', ['model', 'scaler', 'manifest'])
+
+
+def _scaler_arrays(scaler):
+    arrays = {
+        'mean_': scaler.mean_,
+        'scale_': scaler.scale_,
+        'var_': scaler.var_,
+        'n_samples_seen_': np.asarray(scaler.n_samples_seen_),
+    }
+    if hasattr(scaler, 'feature_names_in_'):
+        arrays['feature_names_in_'] = np.asarray(scaler.feature_names_in_, dtype=str)
+    return arrays
+
+
+def _scaler_from_arrays(arrays):
+    scaler = StandardScaler()
+    scaler.mean_ = arrays['mean_']
+    scaler.scale_ = arrays['scale_']
+    scaler.var_ = arrays['var_']
+    scaler.n_samples_seen_ = arrays['n_samples_seen_'][()]
+    scaler.n_features_in_ = len(scaler.mean_)
+    if 'feature_names_in_' in arrays:
+        scaler.feature_names_in_ = arrays['feature_names_in_'].astype(object)
+    return scaler
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_artifacts(directory, ticker, model, scaler, features, metrics=None, extra=None):
+    """Write booster, scaler and a new manifest version into directory.
+
+    Files are written under temporary names and renamed, manifest last, so a
+    reader never sees a manifest pointing at half-written artifacts. model may
+    be an XGBClassifier or a raw Booster; scaler may be None.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory) or {}
+
+    model_path = os.path.join(directory, MODEL_FILE)
+    scaler_path = os.path.join(directory, SCALER_FILE)
+    model.save_model(model_path + '.tmp.ubj')
+    if scaler is not None:
+        with open(scaler_path + '.tmp', 'wb') as f:
+            np.savez(f, **_scaler_arrays(scaler))
+    os.replace(model_path + '.tmp.ubj', model_path)
+    if scaler is not None:
+        os.replace(scaler_path + '.tmp', scaler_path)
+
+    manifest = {
+        'ticker': ticker,
+        'version': int(previous.get('version', 0)) + 1,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'features': list(features),
+        'metrics': metrics or {},
+        'model_file': MODEL_FILE,
+        'scaler_file': SCALER_FILE if scaler is not None else None,
+        'xgboost_version': xgb.__version__,
+    }
+    manifest.update(extra or {})
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    # Old model.pkl/scaler.pkl are left in place (they are tracked in git);
+    # load_artifacts reads the manifest first, so they are never used again
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def load_artifacts(directory):
+    """Load a model directory without caching"""
+    manifest = read_manifest(directory)
+    if manifest is not None:
+        model = xgb.XGBClassifier()
+        model.load_model(os.path.join(directory, manifest.get('model_file', MODEL_FILE)))
+        scaler = None
+        scaler_file = manifest.get('scaler_file', SCALER_FILE)
+        if scaler_file:
+            with np.load(os.path.join(directory, scaler_file)) as arrays:
+                scaler = _scaler_from_arrays({k: arrays[k] for k in arrays.files})
+        return ModelArtifacts(model, scaler, manifest)
+
+    # Legacy pickled artifacts
+    for name in LEGACY_MODEL_FILES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            with open(os.path.join(directory, LEGACY_SCALER_FILE), 'rb') as f:
+                scaler = pickle.load(f)
+            features = list(getattr(scaler, 'feature_names_in_', []))
+            return ModelArtifacts(model, scaler, {'version': 0, 'format': 'pickle',
+                                                  'features': features})
+    raise FileNotFoundError(f"No model artifacts in {directory}")
+
+
+def _artifact_mtime(directory):
+    for name in (MANIFEST_FILE,) + LEGACY_MODEL_FILES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return os.path.getmtime(path)
+    return None
+
+
+class ModelRegistry:
+    """Per-ticker model store with a thread-safe, size-bounded LRU cache"""
+
+    def __init__(self, root=MODELS_DIR, max_size=64):
+        self.root = root
+        self.max_size = max_size
+        self._cache = OrderedDict()  # ticker -> (mtime, ModelArtifacts)
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0,
+                        'load_seconds': {}}
+
+    def __len__(self):
+        return len(self._cache)
+
+    def path(self, ticker):
+        return os.path.join(self.root, ticker)
+
+    def tickers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(t for t in os.listdir(self.root) if _artifact_mtime(self.path(t)) is not None)
+
+    def save(self, ticker, model, scaler, features, metrics=None, extra=None):
+        manifest = save_artifacts(self.path(ticker), ticker, model, scaler, features, metrics, extra)
+        with self._lock:
+            self._cache.pop(ticker, None)
+        return manifest
+
+    def manifest(self, ticker):
+        return read_manifest(self.path(ticker))
+
+    def load(self, ticker):
+        """Cached artifacts for ticker, reloaded if they changed on disk"""
+        directory = self.path(ticker)
+        mtime = _artifact_mtime(directory)
+        if mtime is None:
+            raise FileNotFoundError(f"No model artifacts for {ticker} in {self.root}")
+
+        with self._lock:
+            cached = self._cache.get(ticker)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(ticker)
+                self.metrics['hits'] += 1
+                return cached[1]
+
+        # Load outside the lock so other tickers are not blocked
+        t0 = time.perf_counter()
+        artifacts = load_artifacts(directory)
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            self.metrics['reloads' if cached is not None else 'misses'] += 1
+            self.metrics['load_seconds'][ticker] = elapsed
+            self._cache[ticker] = (mtime, artifacts)
+            self._cache.move_to_end(ticker)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.metrics['evictions'] += 1
+        return artifacts
+
+    def warm(self, tickers=None, workers=8):
+        """Load many models in parallel; returns a load-time report"""
+        tickers = self.tickers() if tickers is None else list(tickers)
+        t0 = time.perf_counter()
+        failed = {}
+
+        def load_one(ticker):
+            try:
+                self.load(ticker)
+            except Exception as e:
+                failed[ticker] = str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(load_one, tickers))
+        loads = [self.metrics['load_seconds'][t] for t in tickers if t in self.metrics['load_seconds']]
+        report = {
+            'models': len(tickers) - len(failed),
+            'failed': failed,
+            'wall_seconds': time.perf_counter() - t0,
+            'load_seconds_total': float(sum(loads)),
+            'load_seconds_max': float(max(loads)) if loads else 0.0,
+        }
+        print(f"[INFO] Warm-loaded {report['models']} models in {report['wall_seconds']:.2f}s "
+              f"(max {report['load_seconds_max'] * 1000:.0f} ms per model)")
+        return report
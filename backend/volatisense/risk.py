@@ -0,0 +1,346 @@
+"""Parametric, filtered-historical and Monte Carlo VaR/CVaR.
+
+Run from ``backend/`` for the cached tickers:
+
+    python -m volatisense.risk --paths 100000 --horizon 1
+
+Every estimator takes simple daily returns as a ``(bars, tickers)`` array
+(a 1-D series is one ticker) and works in return units like ``var95_pct`` in
+``stats.risk_metrics``: VaR is the ``level`` quantile of the return
+distribution and CVaR the mean return at or below it, both negative for
+losses. Results are arrays of shape ``(levels, tickers)``; multiply by the
+price or position value for currency amounts.
+
+- ``parametric_var``: normal, or Cornish-Fisher adjusted for sample skew and
+  excess kurtosis
+- ``filtered_var``: historical quantiles of volatility-standardized returns,
+  rescaled to tomorrow's EWMA or GARCH(1,1) volatility
+- ``simulate_var``: correlated normal or Student-t paths for all tickers at
+  once, generated in chunks; only the loss tail of each ticker (the
+  worst 5% at VaR95) is kept between chunks, never the full path matrix
+- ``portfolio_var``: variance-covariance VaR of a weighted portfolio with
+  each ticker's contribution
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+from scipy.stats import kurtosis, norm, skew
+
+LEVELS = (0.05, 0.01)
+LOOKBACK = 250          # One trading year of returns, as in model_stats
+EWMA_LAMBDA = 0.94      # RiskMetrics daily decay
+MC_PATHS = 100_000
+MC_CHUNK = 16_384       # Paths simulated at once; memory is about chunk x tickers x 16 bytes
+CF_GRID = 64            # Quantiles averaged for the Cornish-Fisher CVaR
+
+
+def _panel(returns):
+    """2-D float64 returns with incomplete rows dropped"""
+    r = np.asarray(returns, dtype=np.float64)
+    if r.ndim == 1:
+        r = r[:, None]
+    return r[~np.isnan(r).any(axis=1)]
+
+
+def _levels(levels):
+    return np.atleast_1d(np.asarray(levels, dtype=np.float64))
+
+
+def _cornish_fisher(z, s, k):
+    """Quantile of a distribution with skew s and excess kurtosis k at normal quantile z"""
+    return (z + (z ** 2 - 1) * s / 6 + (z ** 3 - 3 * z) * k / 24
+            - (2 * z ** 3 - 5 * z) * s ** 2 / 36)
+
+
+def parametric_var(returns, levels=LEVELS, method='normal'):
+    """VaR and CVaR from the first two (normal) or four (Cornish-Fisher) moments"""
+    r = _panel(returns)
+    levels = _levels(levels)
+    mu = r.mean(axis=0)
+    sigma = r.std(axis=0, ddof=1)
+    z = norm.ppf(levels)[:, None]
+    if method == 'normal':
+        var = mu + sigma * z
+        cvar = mu - sigma * norm.pdf(z) / levels[:, None]
+    elif method == 'cornish_fisher':
+        s = skew(r, axis=0)
+        k = kurtosis(r, axis=0)
+        var = mu + sigma * _cornish_fisher(z, s, k)
+        # CVaR as the average adjusted quantile over the tail (midpoint rule)
+        u = levels[:, None] * (np.arange(CF_GRID) + 0.5) / CF_GRID
+        tail = _cornish_fisher(norm.ppf(u)[:, :, None], s, k)
+        cvar = mu + sigma * tail.mean(axis=1)
+    else:
+        raise ValueError(f"Unknown parametric method: {method}")
+    return {"var": var, "cvar": cvar}
+
+
+def conditional_variance(returns, omega, alpha, beta):
+    """GARCH(1,1) variance per bar and the one-step forecast after the last bar.
+
+    sigma2[t] = omega + alpha * r[t-1]**2 + beta * sigma2[t-1], started from the
+    sample variance. EWMA is omega=0, alpha=1-lambda, beta=lambda. The
+    recursion is linear in sigma2, so it runs in C through ``lfilter``, along
+    axis 0 for every column at once.
+    """
+    r = _panel(returns)
+    start = r.var(axis=0)
+    x = omega + alpha * r ** 2
+    y = lfilter([1.0], [1.0, -beta], x, axis=0, zi=(beta * start)[None, :])[0]
+    sigma2 = np.vstack([start[None, :], y[:-1]])
+    return sigma2, y[-1]
+
+
+def fit_garch(returns):
+    """(omega, alpha, beta) of a GARCH(1,1) by Gaussian quasi-maximum likelihood.
+
+    Variance targeting fixes omega at var * (1 - alpha - beta), which leaves two
+    bounded parameters for L-BFGS-B.
+    """
+    r = _panel(returns)[:, 0]
+    r = r - r.mean()
+    target = r.var()
+
+    def nll(params):
+        alpha, beta = params
+        if alpha + beta >= 0.999:
+            return 1e10
+        sigma2, _ = conditional_variance(r, target * (1 - alpha - beta), alpha, beta)
+        sigma2 = sigma2[:, 0]
+        return 0.5 * float(np.sum(np.log(sigma2) + r ** 2 / sigma2))
+
+    result = minimize(nll, x0=[0.05, 0.90], method='L-BFGS-B',
+                      bounds=[(1e-6, 0.5), (0.0, 0.998)])
+    alpha, beta = result.x
+    return target * (1 - alpha - beta), float(alpha), float(beta)
+
+
+def _tail_stats(sorted_values, levels, n):
+    """VaR/CVaR per column from the smallest order statistics of n samples.
+
+    sorted_values holds at least the floor(max(level) * (n - 1)) + 2 smallest
+    samples in ascending order, which is all the linear-interpolated quantile
+    (``np.quantile``) and the tail mean need.
+    """
+    pos = levels * (n - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = (pos - lo)[:, None]
+    var = sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+    tail = sorted_values[None, :, :] <= var[:, None, :]
+    cvar = (np.where(tail, sorted_values[None, :, :], 0.0).sum(axis=1)
+            / np.maximum(tail.sum(axis=1), 1))
+    return var, cvar
+
+
+def filtered_var(returns, levels=LEVELS, model='ewma', lam=EWMA_LAMBDA):
+    """Filtered historical simulation: standardized residuals rescaled to the forecast volatility"""
+    r = _panel(returns)
+    levels = _levels(levels)
+    if model == 'ewma':
+        sigma2, forecast = conditional_variance(r, 0.0, 1 - lam, lam)
+        params = None
+    elif model == 'garch':
+        params = [fit_garch(r[:, j]) for j in range(r.shape[1])]
+        columns = [conditional_variance(r[:, j], *p) for j, p in enumerate(params)]
+        sigma2 = np.hstack([c[0] for c in columns])
+        forecast = np.concatenate([c[1] for c in columns])
+    else:
+        raise ValueError(f"Unknown volatility model: {model}")
+    scenarios = np.sort(r / np.sqrt(sigma2), axis=0) * np.sqrt(forecast)
+    var, cvar = _tail_stats(scenarios, levels, len(scenarios))
+    return {"var": var, "cvar": cvar, "volatility": np.sqrt(forecast), "params": params}
+
+
+def _cholesky(cov):
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Not positive definite (e.g. collinear tickers): clip negative eigenvalues
+        w, v = np.linalg.eigh(cov)
+        return v * np.sqrt(np.clip(w, 0.0, None))
+
+
+def _smallest(values, k):
+    """The k smallest rows of each column, unordered"""
+    if len(values) <= k:
+        return values
+    return np.partition(values, k - 1, axis=0)[:k]
+
+
+def simulate_var(returns, levels=LEVELS, paths=MC_PATHS, horizon=1, weights=None, df=None,
+                 volatility=None, chunk=MC_CHUNK, seed=None):
+    """Monte Carlo VaR/CVaR over ``horizon`` days for every ticker and optionally a portfolio.
+
+    Paths are drawn from a multivariate normal (or Student-t with ``df``
+    degrees of freedom, scaled to the same covariance) with the sample mean
+    and covariance of ``returns``. ``volatility`` replaces the per-ticker
+    volatilities (e.g. EWMA forecasts) while keeping the sample correlations.
+    Multi-day horizons scale the mean by h and the covariance by h.
+    """
+    r = _panel(returns)
+    levels = _levels(levels)
+    n_tickers = r.shape[1]
+    mu = r.mean(axis=0) * horizon
+    cov = np.atleast_2d(np.cov(r, rowvar=False))
+    if volatility is not None:
+        std = np.sqrt(np.diag(cov))
+        scale = np.asarray(volatility, dtype=np.float64) / np.where(std > 0, std, 1.0)
+        cov = cov * np.outer(scale, scale)
+    chol_t = (_cholesky(cov) * np.sqrt(horizon)).T
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)
+
+    k = int(np.floor(levels.max() * (paths - 1))) + 2
+    rng = np.random.default_rng(seed)
+    tails = np.empty((0, n_tickers))
+    portfolio = np.empty((0, 1))
+    for start in range(0, paths, chunk):
+        m = min(chunk, paths - start)
+        z = rng.standard_normal((m, n_tickers))
+        if df:
+            # Shared chi-square draw per path gives a multivariate t with unit variance
+            z *= np.sqrt((df - 2) / rng.chisquare(df, (m, 1)))
+        sims = z @ chol_t
+        sims += mu
+        tails = _smallest(np.vstack([tails, sims]), k)
+        if w is not None:
+            portfolio = _smallest(np.vstack([portfolio, (sims @ w)[:, None]]), k)
+
+    var, cvar = _tail_stats(np.sort(tails, axis=0), levels, paths)
+    result = {"var": var, "cvar": cvar, "paths": paths, "horizon": horizon}
+    if w is not None:
+        p_var, p_cvar = _tail_stats(np.sort(portfolio, axis=0), levels, paths)
+        result["portfolio_var"] = p_var[:, 0]
+        result["portfolio_cvar"] = p_cvar[:, 0]
+    return result
+
+
+def portfolio_var(returns, weights, levels=LEVELS, horizon=1):
+    """Variance-covariance VaR/CVaR of a weighted portfolio.
+
+    ``components`` splits the VaR's volatility term across tickers (Euler
+    allocation, w_i * (cov @ w)_i / sigma_p); each row sums to var - mean.
+    """
+    r = _panel(returns)
+    levels = _levels(levels)
+    w = np.asarray(weights, dtype=np.float64)
+    cov = np.atleast_2d(np.cov(r, rowvar=False)) * horizon
+    mu = float(r.mean(axis=0) @ w) * horizon
+    sigma = float(np.sqrt(w @ cov @ w))
+    z = norm.ppf(levels)
+    marginal = cov @ w / sigma if sigma > 0 else np.zeros_like(w)
+    return {
+        "var": mu + sigma * z,
+        "cvar": mu - sigma * norm.pdf(z) / levels,
+        "volatility": sigma,
+        "components": z[:, None] * (w * marginal)[None, :],
+    }
+
+
+def returns_panel(store, tickers, lookback=LOOKBACK):
+    """Daily returns of the cached tickers on a shared calendar, last ``lookback`` bars.
+
+    Prices are carried forward over another market's holidays, so a ticker
+    whose exchange was closed has a 0% return that day. Bars before every
+    ticker has a price are dropped.
+    """
+    closes = {}
+    for ticker in tickers:
+        bars = store.cached(ticker)
+        if not bars.empty:
+            closes[ticker] = bars['Close']
+    if not closes:
+        return pd.DataFrame()
+    prices = pd.concat(closes, axis=1).sort_index().ffill()
+    returns = prices.pct_change(fill_method=None).dropna()
+    return returns.iloc[-lookback:] if lookback else returns
+
+
+def risk_report(returns, levels=LEVELS, paths=MC_PATHS, horizon=1, weights=None, seed=None):
+    """Every estimator on one returns panel, as JSON-ready per-ticker rows plus a portfolio block"""
+    r = returns.to_numpy(dtype=np.float64)
+    tickers = list(returns.columns)
+    weights = np.full(len(tickers), 1.0 / len(tickers)) if weights is None else np.asarray(weights)
+    timings = {}
+
+    def timed(name, fn):
+        t0 = time.perf_counter()
+        out = fn()
+        timings[name] = time.perf_counter() - t0
+        return out
+
+    methods = {
+        "normal": timed('normal_s', lambda: parametric_var(r, levels, 'normal')),
+        "cornish_fisher": timed('cornish_fisher_s', lambda: parametric_var(r, levels, 'cornish_fisher')),
+        "ewma": timed('ewma_s', lambda: filtered_var(r, levels, 'ewma')),
+        "garch": timed('garch_s', lambda: filtered_var(r, levels, 'garch')),
+    }
+    mc = timed('monte_carlo_s', lambda: simulate_var(r, levels, paths, horizon, weights, seed=seed))
+    methods["monte_carlo"] = mc
+    parametric = portfolio_var(r, weights, levels, horizon)
+
+    names = [f"var{round((1 - q) * 100)}" for q in _levels(levels)]
+    rows = {}
+    for j, ticker in enumerate(tickers):
+        rows[ticker] = {method: {name: {"var": float(m["var"][i, j]), "cvar": float(m["cvar"][i, j])}
+                                 for i, name in enumerate(names)}
+                        for method, m in methods.items()}
+    return {
+        "tickers": rows,
+        "portfolio": {
+            "weights": dict(zip(tickers, weights.tolist())),
+            "parametric": {name: {"var": float(parametric["var"][i]),
+                                  "cvar": float(parametric["cvar"][i]),
+                                  "components": dict(zip(tickers, parametric["components"][i].tolist()))}
+                           for i, name in enumerate(names)},
+            "monte_carlo": {name: {"var": float(mc["portfolio_var"][i]),
+                                   "cvar": float(mc["portfolio_cvar"][i])}
+                            for i, name in enumerate(names)},
+        },
+        "bars": int(len(r)),
+        "paths": paths,
+        "horizon": horizon,
+        "seconds": timings,
+    }
+
+
+if __name__ == "__main__":
+    from volatisense.price_store import PriceStore
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', nargs='+', default=None, help='Cached tickers (default: all)')
+    parser.add_argument('--lookback', type=int, default=LOOKBACK, help='Bars of returns to use')
+    parser.add_argument('--paths', type=int, default=MC_PATHS, help='Monte Carlo paths')
+    parser.add_argument('--horizon', type=int, default=1, help='Holding period in days')
+    parser.add_argument('--seed', type=int, default=None, help='Monte Carlo seed')
+    parser.add_argument('--json', default=None, help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    store = PriceStore()
+    tickers = args.tickers
+    if tickers is None:
+        tickers = sorted(os.path.splitext(f)[0] for f in os.listdir(store.cache_dir)
+                         if f.endswith('.parquet'))
+    panel = returns_panel(store, tickers, args.lookback)
+    if panel.empty:
+        raise SystemExit("[ERROR] No cached prices; run the ingest first")
+
+    report = risk_report(panel, paths=args.paths, horizon=args.horizon, seed=args.seed)
+    print(f"  {'ticker':<16}{'normal':>9}{'C-F':>9}{'EWMA':>9}{'GARCH':>9}{'MC':>9}   (VaR95, {args.horizon}d)")
+    for ticker, row in report['tickers'].items():
+        print(f"  {ticker:<16}" + "".join(f"{row[m]['var95']['var'] * 100:>8.2f}%"
+                                          for m in ('normal', 'cornish_fisher', 'ewma', 'garch', 'monte_carlo')))
+    portfolio = report['portfolio']
+    print(f"[INFO] Equal-weight portfolio VaR95: parametric {portfolio['parametric']['var95']['var'] * 100:.2f}%, "
+          f"Monte Carlo {portfolio['monte_carlo']['var95']['var'] * 100:.2f}%")
+    print("[INFO] " + ", ".join(f"{k[:-2]} {v * 1000:.0f} ms" for k, v in report['seconds'].items()))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {args.json}")
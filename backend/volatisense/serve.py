@@ -0,0 +1,329 @@
+"""Local inference server for the per-ticker risk models.
+
+Run from ``backend/``:
+
+    python -m volatisense.serve --port 8001
+
+Endpoints:
+
+- ``GET /predict/<ticker>``: risk class for the latest cached bar
+- ``POST /predict``: ``{"tickers": [...]}`` for latest bars, or
+  ``{"ticker": t, "rows": [[...], ...]}`` to score explicit feature rows
+- ``GET /health``: loaded models, queue depth and latency percentiles
+
+Models come from the registry and features from the local price store, so no
+network or database access happens on the request path. Requests arriving
+within ``--batch-ms`` of each other are coalesced into one booster call per
+model.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+
+from volatisense.defaults import INDEX_TICKER, SENSEX_TICKERS
+from volatisense.labels import RISK_LABELS
+from volatisense.market import MARKET_FEATURES, join_market, load_market, ticker_features
+from volatisense.price_store import PriceStore
+from volatisense.registry import ModelRegistry
+from volatisense.streaming import StreamingFeatures
+
+
+def model_features(artifacts):
+    """Feature names the model was trained on, in training order"""
+    features = artifacts.manifest.get('features') or list(getattr(artifacts.scaler, 'feature_names_in_', []))
+    if not features:
+        # Old pickles do not record their columns, so their input row cannot be rebuilt
+        raise KeyError(f"Model for {artifacts.manifest.get('ticker', 'ticker')} has no feature list; "
+                       f"retrain it to serve predictions")
+    return list(features)
+
+
+class FeatureCache:
+    """Latest training-feature row per ticker, recomputed only when the price cache changes.
+
+    Each ticker keeps a streaming feature engine, so a cache update costs
+    only the bars appended since the last request. The engine starts over
+    when bars were inserted before ones it has already consumed, or when the
+    last bar it consumed was re-downloaded with different values.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._rows = {}
+        self._engines = {}  # ticker -> (first date, bars consumed, last bar, engine, last complete row)
+        self._market = (None, None)  # (cache mtimes, market features)
+        self._lock = threading.Lock()
+        self._engine_lock = threading.Lock()
+
+    @staticmethod
+    def _can_extend(bars, first, consumed, last_bar):
+        """Whether the bars an engine consumed are still the first bars here, with the same values"""
+        if last_bar is None or bars.index[0] != first or last_bar.name not in bars.index:
+            return False
+        # Earlier bars never change; the price store only rewrites its last cached bar
+        return (bars.index.get_loc(last_bar.name) == consumed - 1
+                and bars.loc[last_bar.name].equals(last_bar))
+
+    def _latest_row(self, ticker, bars):
+        # Raw bar plus training features of the newest bar that has all of them
+        with self._engine_lock:
+            first, consumed, last_bar, engine, last = self._engines.get(ticker, (None, 0, None, None, None))
+            if not self._can_extend(bars, first, consumed, last_bar):
+                engine, last = StreamingFeatures(), None
+            new = engine.extend(bars)
+            data = pd.concat([bars.loc[new.index], new], axis=1).dropna()
+            if not data.empty:
+                last = data.iloc[[-1]]
+            self._engines[ticker] = (bars.index[0], len(bars), bars.iloc[-1], engine, last)
+            return last
+
+    def _market_features(self, ticker):
+        # The panel spans every constituent, so any of their caches changing invalidates it
+        stamp = tuple(self.store.mtime(t) for t in [INDEX_TICKER] + SENSEX_TICKERS)
+        with self._lock:
+            cached_stamp, features = self._market
+        if cached_stamp != stamp:
+            features, _ = load_market(self.store)
+            with self._lock:
+                self._market = (stamp, features)
+        market = ticker_features(features, ticker)
+        if market is None:
+            raise KeyError(f"No market features for {ticker}")
+        return stamp, market
+
+    def latest(self, ticker, features):
+        mtime = self.store.mtime(ticker)
+        if mtime is None:
+            raise KeyError(f"No cached price history for {ticker}")
+        market = None
+        if any(f in MARKET_FEATURES for f in features):
+            # Trained with --market-features
+            stamp, market = self._market_features(ticker)
+            mtime = (mtime, stamp)
+        key = (ticker, tuple(features))
+        with self._lock:
+            cached = self._rows.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        bars = self.store.cached(ticker)
+        data = self._latest_row(ticker, bars) if not bars.empty else None
+        if data is not None and market is not None:
+            data = join_market(data, market)
+        if data is None or data.empty:
+            raise KeyError(f"Not enough history to compute features for {ticker}")
+        row = data[features].iloc[-1].to_numpy(dtype=np.float64)
+        as_of = data.index[-1].strftime('%Y-%m-%d')
+        with self._lock:
+            self._rows[key] = (mtime, row, as_of)
+        return row, as_of
+
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests into one batched predict per model.
+
+    A single worker thread takes the first queued request, keeps collecting for
+    up to ``max_wait`` seconds (or ``max_batch`` requests), groups them by
+    ticker and runs one scaler transform + prediction per ticker.
+    """
+
+    def __init__(self, registry, max_wait=0.002, max_batch=512):
+        self.registry = registry
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, ticker, rows):
+        future = Future()
+        self.queue.put((ticker, np.atleast_2d(np.asarray(rows, dtype=np.float64)), future))
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for ticker, rows, future in batch:
+                groups.setdefault(ticker, []).append((rows, future))
+            for ticker, items in groups.items():
+                self._score(ticker, items)
+            self.batches += 1
+            self.requests += len(batch)
+
+    def _score(self, ticker, items):
+        try:
+            artifacts = self.registry.load(ticker)
+            X = np.vstack([rows for rows, _ in items])
+            # StandardScaler.transform without the per-call validation overhead
+            scaler = artifacts.scaler
+            X = (X - scaler.mean_) / scaler.scale_
+            # Booster margins + softmax equal predict_proba without the DMatrix round trip
+            margin = artifacts.model.get_booster().inplace_predict(X, predict_type='margin')
+            margin = np.exp(margin - margin.max(axis=1, keepdims=True))
+            proba = margin / margin.sum(axis=1, keepdims=True)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        offset = 0
+        for rows, future in items:
+            future.set_result(proba[offset:offset + len(rows)])
+            offset += len(rows)
+
+
+class InferenceService:
+    def __init__(self, registry=None, store=None, max_wait=0.002):
+        # An injected registry with nothing loaded yet has len() 0, so test for None
+        self.registry = registry if registry is not None else ModelRegistry()
+        self.features = FeatureCache(store if store is not None else PriceStore())
+        self.batcher = MicroBatcher(self.registry, max_wait=max_wait)
+        self.latencies = deque(maxlen=10000)
+
+    def _result(self, ticker, proba, artifacts, as_of=None):
+        codes = proba.argmax(axis=1)
+        results = [{
+            "ticker": ticker,
+            "riskCode": int(code),
+            "riskLevel": RISK_LABELS[code],
+            "probabilities": [float(p) for p in probs],
+            "modelVersion": artifacts.manifest.get('version'),
+        } for code, probs in zip(codes.tolist(), proba)]
+        if as_of is not None:
+            for result in results:
+                result["asOf"] = as_of
+        return results
+
+    def predict_latest(self, tickers, timeout=5.0):
+        pending = []
+        for ticker in tickers:
+            artifacts = self.registry.load(ticker)
+            row, as_of = self.features.latest(ticker, model_features(artifacts))
+            pending.append((ticker, artifacts, as_of, self.batcher.submit(ticker, row)))
+        return [self._result(ticker, future.result(timeout), artifacts, as_of)[0]
+                for ticker, artifacts, as_of, future in pending]
+
+    def predict_rows(self, ticker, rows, timeout=5.0):
+        artifacts = self.registry.load(ticker)
+        proba = self.batcher.submit(ticker, rows).result(timeout)
+        return self._result(ticker, proba, artifacts)
+
+    def health(self):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "models": len(self.registry),
+            "queued": self.batcher.queue.qsize(),
+            "requests": self.batcher.requests,
+            "batches": self.batcher.batches,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+            },
+            "registry": {k: v for k, v in self.registry.metrics.items() if k != 'load_seconds'},
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as two writes; with Nagle on, a keep-alive
+        # client's delayed ACK holds the body back ~40 ms
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass  # One line per request would dominate the cost of a prediction
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, fn):
+            t0 = time.perf_counter()
+            try:
+                self._send(200, fn())
+            except (KeyError, FileNotFoundError) as e:
+                self._send(404, {"error": str(e)})
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+            service.latencies.append(time.perf_counter() - t0)
+
+        def do_GET(self):
+            path = unquote(self.path.split('?', 1)[0])
+            if path == '/health':
+                self._send(200, service.health())
+            elif path.startswith('/predict/'):
+                ticker = path[len('/predict/'):]
+                self._handle(lambda: service.predict_latest([ticker])[0])
+            else:
+                self._send(404, {"error": f"Unknown path {path}"})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send(404, {"error": f"Unknown path {self.path}"})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except json.JSONDecodeError as e:
+                self._send(400, {"error": str(e)})
+                return
+            if 'rows' in body:
+                self._handle(lambda: service.predict_rows(body['ticker'], body['rows']))
+            else:
+                self._handle(lambda: service.predict_latest(body.get('tickers', [])))
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8001, help='Port to listen on')
+    parser.add_argument('--batch-ms', type=float, default=2.0, help='Micro-batching window')
+    args = parser.parse_args()
+
+    service = InferenceService(max_wait=args.batch_ms / 1000.0)
+    service.registry.warm()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"[INFO] Inference server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
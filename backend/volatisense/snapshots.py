@@ -0,0 +1,109 @@
+"""Precomputed dashboard snapshots with content-hash ETags.
+
+Next to each ``model_stats`` document the stats writer keeps a compact
+snapshot in ``model_snapshots``. It holds the dashboard fields with rounded
+floats, serialized once to canonical JSON, together with an ETag taken from
+the hash of that JSON. The API can send ``json`` as is and answer
+``If-None-Match`` with a 304 without building a response. A summary
+snapshot (key ``_all``) lists every ticker's headline numbers and ETag, so
+the dashboard can load all of them in one read.
+
+Timestamps are left out of the hashed body, so rerunning the pipeline on
+unchanged data writes nothing and every cached ETag stays valid.
+"""
+import hashlib
+import json
+import math
+from datetime import datetime
+
+import pymongo
+
+SNAPSHOT_COLLECTION = "model_snapshots"
+SUMMARY_KEY = "_all"
+MARKET_KEY = "_market"  # Cross-sectional matrix from volatisense.market
+
+PRICE_DIGITS = 4  # Prices and price-unit VaR
+RATIO_DIGITS = 6  # Returns, volatilities, probabilities
+
+
+def canonical_json(body):
+    return json.dumps(body, sort_keys=True, separators=(',', ':'), allow_nan=False)
+
+
+def content_etag(text):
+    """Strong ETag (quoted) for a serialized body"""
+    return '"' + hashlib.sha1(text.encode()).hexdigest()[:20] + '"'
+
+
+def _num(value, digits):
+    # NaN/inf are not valid JSON; the dashboard gets null instead
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def _headline(stats):
+    return {
+        "ticker": stats["ticker"],
+        "var95": _num(stats["var95"], PRICE_DIGITS),
+        "var99": _num(stats["var99"], PRICE_DIGITS),
+        "cvar": _num(stats["cvar"], PRICE_DIGITS),
+        "riskLevel": stats["riskLevel"],
+        "accuracy": _num(stats["accuracy"], RATIO_DIGITS),
+        "asOf": stats["priceHistory"][-1]["date"] if stats.get("priceHistory") else None,
+    }
+
+
+def snapshot_body(stats):
+    """Dashboard payload from a model_stats document, same field names, rounded floats"""
+    body = _headline(stats)
+    body["priceHistory"] = [{"date": p["date"], "price": _num(p["price"], PRICE_DIGITS)}
+                            for p in stats["priceHistory"]]
+    body["volatilityData"] = [{"date": v["date"], "volatility": _num(v["volatility"], RATIO_DIGITS)}
+                              for v in stats["volatilityData"]]
+    body["varData"] = [{"loss": v["loss"], "probability": _num(v["probability"], RATIO_DIGITS)}
+                       for v in stats["varData"]]
+    backtest = stats.get("backtest")
+    if backtest:
+        body["backtest"] = {
+            "windows": backtest["windows"],
+            "n_test": backtest["n_test"],
+            **{name: {k: _num(backtest[name][k], RATIO_DIGITS)
+                      for k in ("rate", "expected", "kupiec_p", "christoffersen_p")}
+               for name in ("var95", "var99") if name in backtest},
+        }
+    return body
+
+
+def ensure_snapshot_indexes(collection):
+    collection.create_index([("key", pymongo.ASCENDING)], unique=True, name="key_unique")
+
+
+def write_snapshot(collection, key, body, summary=None):
+    """Store body under key unless the stored ETag already matches; returns True if written"""
+    text = canonical_json(body)
+    etag = content_etag(text)
+    stored = collection.find_one({"key": key}, {"_id": 0, "etag": 1})
+    if stored is not None and stored.get("etag") == etag:
+        return False
+    doc = {"key": key, "etag": etag, "json": text, "bytes": len(text), "updatedAt": datetime.now()}
+    if summary is not None:
+        doc["summary"] = summary
+    collection.update_one({"key": key}, {"$set": doc}, upsert=True)
+    return True
+
+
+def write_ticker_snapshot(collection, stats):
+    body = snapshot_body(stats)
+    return write_snapshot(collection, stats["ticker"], body, summary=_headline(stats))
+
+
+def refresh_summary(collection):
+    """Rebuild the all-tickers snapshot from the per-ticker ones; returns True if it changed"""
+    rows = [
+        {**doc["summary"], "etag": doc["etag"]}
+        for doc in collection.find({"key": {"$ne": SUMMARY_KEY}},
+                                   {"_id": 0, "key": 1, "etag": 1, "summary": 1})
+        if doc.get("summary")
+    ]
+    rows.sort(key=lambda row: row["ticker"])
+    return write_snapshot(collection, SUMMARY_KEY, {"tickers": rows})
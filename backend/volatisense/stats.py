@@ -0,0 +1,119 @@
+"""Vectorized builder for the ``model_stats`` dashboard payload.
+
+Returns are sorted once; VaR, CVaR and the whole loss-probability curve are
+read from that single sorted array with ``searchsorted``, and the chart
+series are built by column-wise conversion instead of row iteration.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from volatisense.features import pct_change, rolling_std
+
+CHART_POINTS = 30
+VAR_CURVE_POINTS = 20
+DEFAULT_VOLATILITY = 0.02  # Used where the 30-day window is not yet full
+
+
+def sorted_quantile(sorted_values, q):
+    """Linear-interpolated quantile of an already sorted array (same as Series.quantile)"""
+    pos = q * (len(sorted_values) - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return float(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo))
+
+
+def last_year(data):
+    """Slice of a price frame covering the year before its last bar"""
+    if data.empty:
+        return data
+    start = data.index[-1] - pd.DateOffset(years=1)
+    return data.loc[data.index >= start]
+
+
+def risk_metrics(close):
+    """VaR95/VaR99/CVaR (absolute, capped) plus the sorted returns they came from"""
+    close = np.asarray(close, dtype=np.float64)
+    returns = pct_change(close)[1:]
+    returns = np.sort(returns[~np.isnan(returns)])
+    current_price = float(close[-1])
+
+    if len(returns) == 0:
+        # Same fallbacks the row-by-row implementation used on errors
+        var95_pct, var99_pct = -0.03, -0.05
+        var95, var99 = current_price * 0.03, current_price * 0.05
+        return {'returns': returns, 'current_price': current_price, 'var95_pct': var95_pct,
+                'var99_pct': var99_pct, 'var95': var95, 'var99': var99, 'cvar': var95 * 1.2}
+
+    var95_pct = sorted_quantile(returns, 0.05)
+    var99_pct = sorted_quantile(returns, 0.01)
+
+    # Absolute loss in price terms, capped at 20% of price as a sanity check
+    max_reasonable_var = current_price * 0.20
+    var95 = min(abs(var95_pct * current_price), max_reasonable_var)
+    var99 = min(abs(var99_pct * current_price), max_reasonable_var)
+
+    # Conditional VaR: mean of the returns at or below the 5% quantile
+    tail = returns[:np.searchsorted(returns, var95_pct, side='right')]
+    if len(tail):
+        cvar = min(abs(float(tail.mean()) * current_price), current_price * 0.25)
+    else:
+        cvar = var95 * 1.2
+
+    return {'returns': returns, 'current_price': current_price, 'var95_pct': var95_pct,
+            'var99_pct': var99_pct, 'var95': var95, 'var99': var99, 'cvar': cvar}
+
+
+def var_curve(sorted_returns, var99_pct, points=VAR_CURVE_POINTS):
+    """P(return <= -loss) for evenly spaced losses from 0 to 1.5 x VaR99 (max 10%)"""
+    max_loss_pct = min(abs(float(var99_pct)) * 1.5, 0.10)
+    losses = np.linspace(0, max_loss_pct, points)
+    if len(sorted_returns):
+        probs = np.searchsorted(sorted_returns, -losses, side='right') / len(sorted_returns)
+    else:
+        probs = np.zeros(points)
+    return [{"loss": f"{loss * 100:.1f}%", "probability": prob}
+            for loss, prob in zip(losses.tolist(), probs.tolist())]
+
+
+def chart_series(data, points=CHART_POINTS):
+    """priceHistory and volatilityData for the last ``points`` bars"""
+    close = data['Close'].to_numpy(dtype=np.float64)
+    # 30-day rolling volatility of returns, aligned to the price dates
+    volatility = rolling_std(pct_change(close), 30)[-points:]
+    volatility = np.where(np.isnan(volatility), DEFAULT_VOLATILITY, volatility)
+
+    dates = pd.DatetimeIndex(data.index[-points:]).strftime('%Y-%m-%d').tolist()
+    prices = close[-points:].tolist()
+    price_history = [{"date": d, "price": p} for d, p in zip(dates, prices)]
+    volatility_data = [{"date": d, "volatility": v} for d, v in zip(dates, volatility.tolist())]
+    return price_history, volatility_data
+
+
+def risk_level(var95, current_price):
+    # Based on 5% VaR as a share of price
+    if var95 > current_price * 0.03:
+        return "High"
+    if var95 < current_price * 0.015:
+        return "Low"
+    return "Medium"
+
+
+def build_model_stats(ticker, data, accuracy):
+    """Build the model_stats document for ticker from a price frame (last year is used)"""
+    data = last_year(data)
+    metrics = risk_metrics(data['Close'])
+    price_history, volatility_data = chart_series(data)
+    return {
+        "ticker": ticker,
+        "var95": float(metrics['var95']),
+        "var99": float(metrics['var99']),
+        "cvar": float(metrics['cvar']),
+        "riskLevel": risk_level(metrics['var95'], metrics['current_price']),
+        "accuracy": float(accuracy),
+        "priceHistory": price_history,
+        "volatilityData": volatility_data,
+        "varData": var_curve(metrics['returns'], metrics['var99_pct']),
+        "updatedAt": datetime.now(),
+    }
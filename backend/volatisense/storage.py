@@ -0,0 +1,215 @@
+"""MongoDB access shared by the pipeline scripts."""
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pymongo
+from pymongo import ReplaceOne, UpdateOne
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://mongo:27017/')
+DB_NAME = os.environ.get('dbName', 'market_risk_assessment')
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide pooled MongoClient, created lazily.
+
+    A client must not be shared across fork(), so worker processes get their own.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = pymongo.MongoClient(MONGO_URI)
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+def ensure_sensex_indexes(collection):
+    # One document per (Ticker, Date); the unique index makes upserts idempotent
+    collection.create_index([("Ticker", pymongo.ASCENDING), ("Date", pymongo.ASCENDING)],
+                            unique=True, name="ticker_date_unique")
+
+
+def row_hashes(df, columns):
+    """One 64-bit content hash per row, computed column-wise without per-row objects"""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy().view(np.int64)
+
+
+def upsert_frame(collection, df, ticker, batch_size=1000):
+    """Write only new or changed rows of df for ticker as unordered bulk upserts.
+
+    df must have a ``Date`` column. Each stored document carries a ``Row_Hash``
+    of its values; rows whose hash already matches are skipped, so re-running
+    the ingest on unchanged data writes nothing. Rows older than the first
+    date in df (fallen out of the history window) are removed.
+    Returns ``(upserted, modified, deleted)``.
+    """
+    value_cols = [c for c in df.columns if c not in ('Date', 'Ticker')]
+    hashes = row_hashes(df, value_cols)
+    dates = pd.DatetimeIndex(df['Date'])
+
+    # Existing (Date -> hash) pairs for this ticker, fetched with a narrow projection
+    existing = {
+        doc['Date']: doc.get('Row_Hash')
+        for doc in collection.find({"Ticker": ticker}, {"_id": 0, "Date": 1, "Row_Hash": 1})
+    }
+    if existing:
+        stored = pd.Series(list(existing.values()), index=pd.DatetimeIndex(list(existing.keys())),
+                           dtype=object)
+        changed = stored.reindex(dates).to_numpy() != hashes
+    else:
+        changed = np.ones(len(df), dtype=bool)
+    positions = np.flatnonzero(changed)
+
+    upserted = modified = 0
+    if len(positions):
+        # Only the changed rows are turned into documents, straight from column arrays
+        subset = df.iloc[positions]
+        names = value_cols + ['Row_Hash']
+        columns = [subset[c].tolist() for c in value_cols] + [hashes[positions].tolist()]
+        keys = subset['Date'].tolist()
+        ops = []
+        for date, values in zip(keys, zip(*columns)):
+            doc = dict(zip(names, values))
+            doc['Ticker'] = ticker
+            ops.append(UpdateOne({"Ticker": ticker, "Date": date}, {"$set": doc}, upsert=True))
+            if len(ops) >= batch_size:
+                result = collection.bulk_write(ops, ordered=False)
+                upserted += result.upserted_count
+                modified += result.modified_count
+                ops = []
+        if ops:
+            result = collection.bulk_write(ops, ordered=False)
+            upserted += result.upserted_count
+            modified += result.modified_count
+
+    deleted = 0
+    if len(dates):
+        deleted = collection.delete_many({"Ticker": ticker, "Date": {"$lt": dates.min()}}).deleted_count
+    return upserted, modified, deleted
+
+
+# Bucketed layout: one document per ticker per month holding columnar arrays
+BUCKET_COLLECTION = "sensex_data_monthly"
+
+
+def ensure_bucket_indexes(collection):
+    collection.create_index([("Ticker", pymongo.ASCENDING), ("Month", pymongo.ASCENDING)],
+                            unique=True, name="ticker_month_unique")
+
+
+def _month_bounds(dates):
+    """Start/end row positions of each calendar month in a sorted DatetimeIndex"""
+    month_ids = dates.year.to_numpy() * 12 + dates.month.to_numpy()
+    cuts = np.flatnonzero(np.diff(month_ids)) + 1
+    return np.concatenate([[0], cuts]), np.concatenate([cuts, [len(dates)]])
+
+
+def frame_to_buckets(df, ticker):
+    """Yield one monthly bucket document per calendar month of df.
+
+    df must have a ``Date`` column sorted ascending. Each bucket stores the
+    month's dates plus one array per column and a ``Bucket_Hash`` derived
+    from the row hashes, so unchanged months can be skipped on rewrite.
+    """
+    value_cols = [c for c in df.columns if c not in ('Date', 'Ticker')]
+    dates = pd.DatetimeIndex(df['Date'])
+    hashes = row_hashes(df, value_cols)
+    arrays = {c: df[c].to_numpy() for c in value_cols}
+    starts, ends = _month_bounds(dates)
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        yield {
+            "Ticker": ticker,
+            "Month": datetime(dates[s].year, dates[s].month, 1),
+            "Count": e - s,
+            "Bucket_Hash": int(pd.util.hash_array(hashes[s:e]).sum().astype(np.int64)),
+            "Dates": dates[s:e].to_pydatetime().tolist(),
+            "Columns": {c: arrays[c][s:e].tolist() for c in value_cols},
+        }
+
+
+def write_buckets(collection, df, ticker):
+    """Write df as monthly buckets, rewriting only months whose content changed.
+
+    Returns ``(upserted, modified, deleted)``.
+    """
+    if df.empty:
+        return 0, 0, 0
+    existing = {
+        doc['Month']: doc.get('Bucket_Hash')
+        for doc in collection.find({"Ticker": ticker}, {"_id": 0, "Month": 1, "Bucket_Hash": 1})
+    }
+    ops = [
+        ReplaceOne({"Ticker": ticker, "Month": doc["Month"]}, doc, upsert=True)
+        for doc in frame_to_buckets(df, ticker)
+        if existing.get(doc["Month"]) != doc["Bucket_Hash"]
+    ]
+
+    upserted = modified = 0
+    if ops:
+        result = collection.bulk_write(ops, ordered=False)
+        upserted, modified = result.upserted_count, result.modified_count
+    first = pd.Timestamp(df['Date'].iloc[0])
+    deleted = collection.delete_many(
+        {"Ticker": ticker, "Month": {"$lt": datetime(first.year, first.month, 1)}}
+    ).deleted_count
+    return upserted, modified, deleted
+
+
+def read_buckets(collection, ticker, start=None, end=None, columns=None):
+    """Return a ticker's rows in [start, end] from the bucketed layout as a DataFrame"""
+    query = {"Ticker": ticker}
+    if start is not None or end is not None:
+        query["Month"] = {}
+        if start is not None:
+            start = pd.Timestamp(start)
+            query["Month"]["$gte"] = datetime(start.year, start.month, 1)
+        if end is not None:
+            query["Month"]["$lte"] = pd.Timestamp(end).to_pydatetime()
+    projection = {"_id": 0, "Dates": 1}
+    if columns is None:
+        projection["Columns"] = 1
+    else:
+        projection.update({f"Columns.{c}": 1 for c in columns})
+
+    dates, parts = [], {}
+    for doc in collection.find(query, projection).sort("Month", pymongo.ASCENDING):
+        dates.extend(doc["Dates"])
+        for name, values in doc["Columns"].items():
+            parts.setdefault(name, []).extend(values)
+    frame = pd.DataFrame({name: np.asarray(values) for name, values in parts.items()},
+                         index=pd.DatetimeIndex(dates, name='Date'))
+    if start is not None:
+        frame = frame.loc[frame.index >= start]
+    if end is not None:
+        frame = frame.loc[frame.index <= pd.Timestamp(end)]
+    return frame
+
+
+def read_rows(collection, ticker, start=None, end=None, columns=None):
+    """Same as read_buckets, for the one-document-per-day ``sensex_data`` layout"""
+    query = {"Ticker": ticker}
+    if start is not None or end is not None:
+        query["Date"] = {}
+        if start is not None:
+            query["Date"]["$gte"] = pd.Timestamp(start).to_pydatetime()
+        if end is not None:
+            query["Date"]["$lte"] = pd.Timestamp(end).to_pydatetime()
+    projection = None if columns is None else {"_id": 0, "Date": 1, **{c: 1 for c in columns}}
+    frame = pd.DataFrame(list(collection.find(query, projection).sort("Date", pymongo.ASCENDING)))
+    if frame.empty:
+        return frame
+    return frame.drop(columns=['_id', 'Ticker', 'Row_Hash'], errors='ignore').set_index('Date')
@@ -0,0 +1,190 @@
+"""Stateful, O(1)-per-bar engine for the training features.
+
+Streaming counterpart of ``feature_frame(bars, 'training')``: it keeps
+running state per indicator, so appending a bar updates every feature
+without touching the history. The row returned for a bar equals the last row
+of ``feature_frame`` run on the history up to and including that bar, within
+floating-point tolerance.
+
+Only the model server uses it (``serve.FeatureCache``), to score new bars
+without recomputing whole histories. The nightly ingest and training runs
+recompute full frames with the vectorized kernel, since their labels and
+re-downloaded last bar depend on the whole history anyway.
+"""
+import math
+from collections import deque
+
+import pandas as pd
+
+from volatisense.features import FEATURE_SETS
+
+NAN = float('nan')
+
+
+def _isnan(x):
+    return x is None or x != x
+
+
+class EMA:
+    """Exponential moving average matching ``ewm(span, adjust=False)``.
+
+    Leading NaN inputs are skipped, which is how pandas treats the warm-up
+    of MACD's signal line.
+    """
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+        self.count = 0
+
+    def update(self, x):
+        if not _isnan(x):
+            self.count += 1
+            if self.count == 1:
+                self.value = x
+            else:
+                self.value += self.alpha * (x - self.value)
+        return self.value if self.count else NAN
+
+
+class RollingWindow:
+    """Fixed-size window with running mean and variance (Welford add/remove)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.n_nan = 0
+        self.n = 0
+        self.mean_ = 0.0
+        self.m2 = 0.0
+
+    def _add(self, x):
+        self.n += 1
+        delta = x - self.mean_
+        self.mean_ += delta / self.n
+        self.m2 += delta * (x - self.mean_)
+
+    def _remove(self, x):
+        if self.n == 1:
+            self.n, self.mean_, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean_
+        self.n -= 1
+        self.mean_ -= delta / self.n
+        self.m2 -= delta * (x - self.mean_)
+
+    def update(self, x):
+        self.values.append(x)
+        if _isnan(x):
+            self.n_nan += 1
+        else:
+            self._add(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if _isnan(old):
+                self.n_nan -= 1
+            else:
+                self._remove(old)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.n_nan == 0
+
+    def mean(self):
+        return self.mean_ if self.ready else NAN
+
+    def std(self):
+        if not self.ready or self.n < 2:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.n - 1))
+
+
+class RSI:
+    """Relative strength index over simple moving averages, as in the training RSI"""
+
+    def __init__(self, window=14):
+        self.prev = NAN
+        self.up = RollingWindow(window)
+        self.down = RollingWindow(window)
+
+    def update(self, close):
+        diff = close - self.prev
+        self.prev = close
+        # The first bar has no diff; pandas' where() turns it into a 0 gain/loss
+        gain = diff if diff > 0 else 0.0
+        loss = -diff if diff < 0 else 0.0
+        self.up.update(gain)
+        self.down.update(loss)
+        avg_up, avg_down = self.up.mean(), self.down.mean()
+        if avg_down == 0:
+            return 100.0 if avg_up > 0 else NAN
+        return 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+
+
+def _pct_change(x, prev):
+    if _isnan(prev) or _isnan(x):
+        return NAN
+    if prev == 0:
+        return NAN  # pandas gives inf, which the pipelines turn into NaN
+    return x / prev - 1.0
+
+
+class TrainingFeatureEngine:
+    """Streaming version of ``train_update.engineer_features``"""
+
+    columns = FEATURE_SETS['training']
+
+    def __init__(self):
+        self.prev_close = NAN
+        self.ret_std5 = RollingWindow(5)
+        self.sma5 = RollingWindow(5)
+        self.sma10 = RollingWindow(10)
+        self.ema5 = EMA(span=5)
+        self.ema10 = EMA(span=10)
+        self.ema12 = EMA(span=12)
+        self.ema26 = EMA(span=26)
+        self.signal = EMA(span=9)
+        self.rsi = RSI(14)
+
+    def update(self, close):
+        ret = _pct_change(close, self.prev_close)
+        self.prev_close = close
+        self.ret_std5.update(ret)
+        self.sma5.update(close)
+        self.sma10.update(close)
+        macd = self.ema12.update(close) - self.ema26.update(close)
+        return {
+            'Return': ret,
+            'Volatility': self.ret_std5.std(),
+            'SMA_5': self.sma5.mean(),
+            'SMA_10': self.sma10.mean(),
+            'EMA_5': self.ema5.update(close),
+            'EMA_10': self.ema10.update(close),
+            'MACD': macd,
+            'MACD_Signal': self.signal.update(macd),
+            'RSI': self.rsi.update(close),
+        }
+
+
+class StreamingFeatures:
+    """Training-feature engine plus the date of the last bar it has consumed.
+
+    ``extend(bars)`` feeds only the bars newer than ``last_date`` and returns
+    their feature rows, so an update costs O(new bars) regardless of how long
+    the history is.
+    """
+
+    columns = TrainingFeatureEngine.columns
+
+    def __init__(self):
+        self.engine = TrainingFeatureEngine()
+        self.last_date = None
+
+    def extend(self, bars):
+        if self.last_date is not None:
+            bars = bars.loc[bars.index > self.last_date]
+        update = self.engine.update
+        rows = [update(c) for c in bars['Close'].to_numpy(dtype=float)]
+        if len(bars):
+            self.last_date = bars.index[-1]
+        return pd.DataFrame(rows, index=bars.index, columns=self.columns)